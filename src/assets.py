@@ -0,0 +1,239 @@
+import hashlib
+import json
+import os
+import posixpath
+import re
+
+from atomic import write_json
+from manifest import file_digest
+from static_sync import sync_file, write_text_if_changed
+
+# bump whenever the outputs or the index format change
+ASSET_FORMAT = 1
+ASSET_EXTENSIONS = (".css", ".js", ".mjs", ".woff", ".woff2", ".ttf", ".otf")
+HASH_LENGTH = 10
+CSS_URL_RE = re.compile(r"""url\(\s*(["']?)([^"')\s]+)\1\s*\)""")
+CSS_TOKEN_RE = re.compile(
+    r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')"""
+    r"|/\*.*?\*/"
+    r"|\s*;\s*(\})\s*"
+    r"|\s*([{};,>])\s*"
+    r"|(:)\s+"
+    r"|\s+",
+    re.S,
+)
+HTML_TOKEN_RE = re.compile(
+    r"(<(pre|textarea|script|style)\b.*?</\2\s*>)"
+    r"|<!--.*?-->"
+    r"|(?<=>)(\s+)(?=<)"
+    r"|\s+",
+    re.S | re.I,
+)
+
+
+def minify_css(text):
+    # Drops comments and the whitespace around punctuation, leaving strings
+    # alone. The space before ":" is kept, as it is a descendant combinator
+    # in selectors such as "a :hover".
+    def replace(match):
+        string, brace, punctuation, colon = match.groups()
+        if string is not None:
+            return string
+        if brace is not None:
+            return brace
+        if punctuation is not None:
+            return punctuation
+        if colon is not None:
+            return colon
+        return "" if match.group(0).startswith("/*") else " "
+
+    return CSS_TOKEN_RE.sub(replace, text).strip()
+
+
+def minify_html(text):
+    # Removes comments and the whitespace between tags of a whole document,
+    # except inside elements where whitespace is content.
+    def replace(match):
+        if match.group(1) is not None:
+            return match.group(1)
+        if match.group(3) is not None or match.group(0).startswith("<!--"):
+            return ""
+        return " "
+
+    return HTML_TOKEN_RE.sub(replace, text).strip()
+
+
+def fingerprinted_path(relpath, digest):
+    root, ext = os.path.splitext(relpath)
+    return f"{root}.{digest[:HASH_LENGTH]}{ext}"
+
+
+def asset_url(relpath):
+    return "/" + relpath.replace(os.sep, "/")
+
+
+def css_url_target(css_relpath, url):
+    # the root-relative URL a url() in the stylesheet points to, or None
+    path = url.split("#", 1)[0].split("?", 1)[0]
+    if not path or path.startswith("//") or ":" in path:
+        return None
+    if path.startswith("/"):
+        return path
+    base = posixpath.dirname(asset_url(css_relpath))
+    return posixpath.normpath(posixpath.join(base, path))
+
+
+def rewrite_css_urls(text, css_relpath, urls):
+    # Points url() references at fingerprinted files, keeping them relative
+    # if they were. Returns the new text and every URL referenced, mapped to
+    # what it was rewritten to, so a change to either can be detected.
+    deps = {}
+
+    def replace(match):
+        url = match.group(2)
+        target = css_url_target(css_relpath, url)
+        if target is None:
+            return match.group(0)
+        fingerprinted = urls.get(target)
+        deps[target] = fingerprinted
+        if fingerprinted is None:
+            return match.group(0)
+        path = url.split("#", 1)[0].split("?", 1)[0]
+        prefix = path[: len(path) - len(posixpath.basename(path))]
+        new_url = prefix + posixpath.basename(fingerprinted) + url[len(path) :]
+        return f"url({match.group(1)}{new_url}{match.group(1)})"
+
+    return CSS_URL_RE.sub(replace, text), deps
+
+
+def urls_digest(urls):
+    data = json.dumps(urls, sort_keys=True).encode()
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+class AssetPipeline:
+    # Writes stylesheets, scripts and fonts from static/ to the output under
+    # content-hashed names, so they can be cached forever, and minifies
+    # stylesheets. The index keeps each asset's output name between builds,
+    # so an unchanged asset is neither read nor hashed again. Stylesheets are
+    # processed last, so their url() references point at fingerprinted
+    # fonts, and the hash covers the rewritten text.
+    def __init__(
+        self, static_dir, output_dir, cache_dir, fingerprint=True, minify=False
+    ):
+        self.static_dir = static_dir
+        self.output_dir = output_dir
+        self.fingerprint = fingerprint
+        self.minify = minify
+        self.index_path = os.path.join(cache_dir, "assets.json")
+        self.entries = {}
+        try:
+            with open(self.index_path) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if (
+            data.get("version") == ASSET_FORMAT
+            and data.get("fingerprint") == fingerprint
+            and data.get("minify") == minify
+        ):
+            self.entries = data["assets"]
+
+    def save(self):
+        write_json(
+            self.index_path,
+            {
+                "version": ASSET_FORMAT,
+                "fingerprint": self.fingerprint,
+                "minify": self.minify,
+                "assets": self.entries,
+            },
+            indent=1,
+            sort_keys=True,
+        )
+
+    def urls(self):
+        if not self.fingerprint:
+            return {}
+        return {
+            asset_url(relpath): asset_url(entry["output"])
+            for relpath, entry in self.entries.items()
+        }
+
+    def outputs(self):
+        return {entry["output"] for entry in self.entries.values()}
+
+    def collect(self):
+        # stylesheets sort after everything else
+        extensions = ASSET_EXTENSIONS if self.fingerprint else (".css",)
+        assets = []
+        for dirpath, dirnames, filenames in os.walk(self.static_dir):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if name.lower().endswith(extensions):
+                    path = os.path.join(dirpath, name)
+                    assets.append(os.path.relpath(path, self.static_dir))
+        return sorted(assets, key=lambda relpath: relpath.lower().endswith(".css"))
+
+    def process(self, relpath, urls):
+        # returns the index entry for an asset and whether its output was
+        # written
+        path = os.path.join(self.static_dir, relpath)
+        stat = os.stat(path)
+        previous = self.entries.get(relpath)
+        if (
+            previous is not None
+            and previous["mtime_ns"] == stat.st_mtime_ns
+            and previous["size"] == stat.st_size
+            and all(urls.get(url) == dep for url, dep in previous["deps"].items())
+            and os.path.exists(os.path.join(self.output_dir, previous["output"]))
+        ):
+            return previous, False
+        deps = {}
+        if relpath.lower().endswith(".css"):
+            with open(path, newline="") as f:
+                text = f.read()
+            text, deps = rewrite_css_urls(text, relpath, urls)
+            if self.minify:
+                text = minify_css(text)
+            digest = hashlib.sha256(text.encode()).hexdigest()
+        else:
+            text = None
+            digest = file_digest(path)
+        output = fingerprinted_path(relpath, digest) if self.fingerprint else relpath
+        dest = os.path.join(self.output_dir, output)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        if text is None:
+            written = sync_file(path, dest)
+        else:
+            written = write_text_if_changed(dest, text)
+        entry = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "deps": deps,
+            "output": output,
+        }
+        return entry, written
+
+    def run(self):
+        # Returns the fingerprinted URL of every asset, keyed by its
+        # root-relative URL, the static/-relative paths of the assets handled
+        # here and the output_dir-relative paths they were written to.
+        entries = {}
+        urls = {}
+        written = []
+        for relpath in self.collect():
+            entry, entry_written = self.process(relpath, urls)
+            entries[relpath] = entry
+            if entry_written:
+                written.append(entry["output"])
+            if self.fingerprint:
+                urls[asset_url(relpath)] = asset_url(entry["output"])
+        self.entries = entries
+        self.save()
+        return {
+            "urls": urls,
+            "files": sorted(entries),
+            "outputs": sorted(self.outputs()),
+            "written": written,
+        }
@@ -0,0 +1,36 @@
+from contextlib import contextmanager
+import json
+import os
+
+
+@contextmanager
+def temporary_path(path):
+    # Yields a temporary path in the same directory that replaces path once
+    # the block finishes, so readers never see a half-written file and a
+    # failure leaves the previous version in place. The process id keeps
+    # concurrent writers from sharing one temporary file.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+@contextmanager
+def atomic_write(path, mode="w", newline=None, encoding=None):
+    # open() for writing through temporary_path; mode "wb" for bytes
+    with temporary_path(path) as tmp_path:
+        with open(tmp_path, mode, newline=newline, encoding=encoding) as f:
+            yield f
+
+
+def write_json(path, data, **options):
+    # saves the JSON state files in the build cache; options go to json.dump
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with atomic_write(path) as f:
+        json.dump(data, f, **options)
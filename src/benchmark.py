@@ -0,0 +1,296 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from htmlnode import LeafNode, ParentNode
+from inline_markdown import text_to_textnodes
+from site_builder import generate_pages
+from markdown_blocks import BlockType, markdown_to_blocks, markdown_to_html_node
+from textnode import TextNode, TextType
+
+DEFAULT_BLOCK_MIX = {
+    BlockType.PARAGRAPH: 6,
+    BlockType.HEADING: 2,
+    BlockType.CODE: 1,
+    BlockType.QUOTE: 1,
+    BlockType.ULIST: 1,
+    BlockType.OLIST: 1,
+}
+WORDS = (
+    "hobbit ring shire elf dwarf wizard mountain river forest tower road "
+    "king sword song star shadow light fire stone ship gate"
+).split()
+TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>
+"""
+
+
+def parse_block_mix(text):
+    mix = {}
+    for item in text.split(","):
+        name, weight = item.split("=")
+        mix[BlockType(name.strip())] = int(weight)
+    return mix
+
+
+def synthetic_words(rng, count, inline_density):
+    words = []
+    for _ in range(count):
+        word = rng.choice(WORDS)
+        if rng.random() < inline_density:
+            markup = rng.randrange(4)
+            if markup == 0:
+                word = f"**{word}**"
+            elif markup == 1:
+                word = f"_{word}_"
+            elif markup == 2:
+                word = f"`{word}`"
+            else:
+                word = f"[{word}](/{rng.choice(WORDS)}/{rng.choice(WORDS)})"
+        words.append(word)
+    return " ".join(words)
+
+
+def synthetic_block(rng, block_type, inline_density):
+    if block_type == BlockType.HEADING:
+        level = rng.randint(2, 6)
+        return "#" * level + " " + synthetic_words(rng, 5, inline_density)
+    if block_type == BlockType.CODE:
+        lines = [synthetic_words(rng, 6, 0) for _ in range(rng.randint(2, 8))]
+        return "```\n" + "\n".join(lines) + "\n```"
+    if block_type == BlockType.QUOTE:
+        lines = [synthetic_words(rng, 12, inline_density) for _ in range(3)]
+        return "\n".join(f"> {line}" for line in lines)
+    if block_type == BlockType.ULIST:
+        items = [synthetic_words(rng, 8, inline_density) for _ in range(5)]
+        return "\n".join(f"- {item}" for item in items)
+    if block_type == BlockType.OLIST:
+        items = [synthetic_words(rng, 8, inline_density) for _ in range(5)]
+        return "\n".join(f"{i}. {item}" for i, item in enumerate(items, 1))
+    lines = [synthetic_words(rng, 15, inline_density) for _ in range(3)]
+    return "\n".join(lines)
+
+
+def synthetic_page(rng, blocks=20, block_mix=None, inline_density=0.2, images=1):
+    block_mix = block_mix or DEFAULT_BLOCK_MIX
+    types = list(block_mix)
+    weights = [block_mix[block_type] for block_type in types]
+    parts = ["# " + synthetic_words(rng, 4, 0)]
+    for block_type in rng.choices(types, weights, k=blocks):
+        parts.append(synthetic_block(rng, block_type, inline_density))
+    for i in range(images):
+        position = rng.randint(1, len(parts))
+        parts.insert(position, f"![image {i}](/images/{rng.choice(WORDS)}{i}.png)")
+    return "\n\n".join(parts) + "\n"
+
+
+def generate_corpus(
+    root,
+    pages=100,
+    blocks=20,
+    block_mix=None,
+    inline_density=0.2,
+    depth=2,
+    images=1,
+    seed=0,
+):
+    rng = random.Random(seed)
+    paths = []
+    for i in range(pages):
+        dirs = [f"section{rng.randrange(4)}" for _ in range(rng.randint(0, depth))]
+        path = os.path.join(root, *dirs, f"page{i}", "index.md")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(synthetic_page(rng, blocks, block_mix, inline_density, images))
+        paths.append(path)
+    return paths
+
+
+def time_call(func, repeat):
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - started)
+    return {"median": statistics.median(runs), "min": min(runs), "runs": repeat}
+
+
+def allocated_bytes(func):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = func()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del result
+    return after - before
+
+
+def node_memory(documents, count=10000):
+    factories = {
+        "TextNode": lambda: TextNode("text", TextType.BOLD),
+        "LeafNode": lambda: LeafNode("b", "text"),
+        "ParentNode": lambda: ParentNode("p", []),
+    }
+    memory = {}
+    for name, factory in factories.items():
+        size = allocated_bytes(lambda: [factory() for _ in range(count)])
+        memory[f"bytes_per_{name}"] = size / count
+    size = allocated_bytes(lambda: [markdown_to_html_node(doc) for doc in documents])
+    memory["bytes_per_page_tree"] = size / len(documents)
+    return memory
+
+
+def run_benchmarks(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        content_dir = os.path.join(tmp, "content")
+        template_path = os.path.join(tmp, "template.html")
+        with open(template_path, "w") as f:
+            f.write(TEMPLATE)
+        paths = generate_corpus(
+            content_dir,
+            args.pages,
+            args.blocks,
+            args.block_mix,
+            args.inline_density,
+            args.depth,
+            args.images,
+            args.seed,
+        )
+        documents = []
+        for path in paths:
+            with open(path) as f:
+                documents.append(f.read())
+        blocks = [block for doc in documents for block in markdown_to_blocks(doc)]
+        inline_texts = [
+            " ".join(block.split("\n"))
+            for block in blocks
+            if not block.startswith(("#", "```", ">", "- ", "1. "))
+        ]
+        nodes = [markdown_to_html_node(doc) for doc in documents]
+
+        def build(workers):
+            dest = tempfile.mkdtemp(dir=tmp)
+            generate_pages(content_dir, dest, template_path, "/", workers=workers)
+
+        results = {
+            "markdown_to_blocks": time_call(
+                lambda: [markdown_to_blocks(doc) for doc in documents], args.repeat
+            ),
+            "text_to_textnodes": time_call(
+                lambda: [text_to_textnodes(text) for text in inline_texts],
+                args.repeat,
+            ),
+            "markdown_to_html_node": time_call(
+                lambda: [markdown_to_html_node(doc) for doc in documents],
+                args.repeat,
+            ),
+            "to_html": time_call(
+                lambda: [node.to_html() for node in nodes], args.repeat
+            ),
+            "generate_pages": time_call(lambda: build(1), args.repeat),
+        }
+        if args.workers > 1:
+            results[f"generate_pages_j{args.workers}"] = time_call(
+                lambda: build(args.workers), args.repeat
+            )
+        memory = node_memory(documents)
+    return {
+        "corpus": {
+            "pages": args.pages,
+            "blocks": args.blocks,
+            "inline_density": args.inline_density,
+            "depth": args.depth,
+            "images": args.images,
+            "seed": args.seed,
+        },
+        "results": results,
+        "memory": memory,
+    }
+
+
+def compare(baseline, current, threshold):
+    regressions = []
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        before = baseline["results"][name]["median"]
+        after = result["median"]
+        if before > 0 and (after - before) / before > threshold:
+            regressions.append((name, before, after))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the generator on a synthetic content tree."
+    )
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--blocks", type=int, default=20, help="blocks per page")
+    parser.add_argument(
+        "--block-mix",
+        type=parse_block_mix,
+        default=None,
+        help="block weights, e.g. paragraph=6,heading=2,code=1",
+    )
+    parser.add_argument(
+        "--inline-density",
+        type=float,
+        default=0.2,
+        help="fraction of words with inline markup or links",
+    )
+    parser.add_argument("--depth", type=int, default=2, help="max directory depth")
+    parser.add_argument("--images", type=int, default=1, help="images per page")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("-j", "--workers", type=int, default=1)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative slowdown reported as a regression (default: %(default)s)",
+    )
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    report = run_benchmarks(args)
+    for name, result in report["results"].items():
+        print(f"{name:<24} {result['median'] * 1000:10.2f}ms")
+    for name, size in report["memory"].items():
+        print(f"{name:<24} {size:10.0f} bytes")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        for name, before, after in regressions:
+            print(
+                f"REGRESSION {name}: {before * 1000:.2f}ms -> {after * 1000:.2f}ms"
+            )
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+
+from atomic import atomic_write
+from depgraph import node_references
+from htmlnode import LeafNode, ParentNode
+from markdown_blocks import (
+    PARSER_VERSION,
+    BlockReader,
+    BlockType,
+    lines_to_html_node,
+)
+from search_index import node_text
+from snapshot import node_to_tuple, tuple_to_node
+from template import rebase_node, rebase_url
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# bump whenever the layout of a cache entry changes
+CACHE_FORMAT = 4
+
+
+class BlockCache:
+    # Content-addressed store of rendered block HTML, its text and the link
+    # and image URLs in it, one JSON file per block under a two character
+    # fan-out directory. Reads refresh the file's mtime, so prune() can
+    # evict the least recently used entries.
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    def key(self, lines, basepath):
+        digest = hashlib.sha256(
+            f"{CACHE_FORMAT}\0{PARSER_VERSION}\0{basepath}\0".encode()
+        )
+        digest.update("\n".join(lines).encode())
+        return digest.hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.path, key[:2], key[2:])
+
+    def get(self, key):
+        entry_path = self.entry_path(key)
+        try:
+            with open(entry_path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        os.utime(entry_path)
+        return entry
+
+    def put(self, key, entry):
+        entry_path = self.entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        with atomic_write(entry_path, encoding="utf-8") as f:
+            json.dump(entry, f)
+
+    def prune(self):
+        entries = []
+        total = 0
+        if not os.path.isdir(self.path):
+            return 0
+        for bucket in os.scandir(self.path):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total += stat.st_size
+        removed = 0
+        entries.sort()
+        for _, size, entry_path in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(entry_path)
+            total -= size
+            removed += 1
+        return removed
+
+
+def needs_node(entry, basepath, assets, image_attrs):
+    # whether the block links a fingerprinted asset or shows an image that
+    # gets attributes added, which both need its nodes rather than its HTML
+    if assets and any(url in assets for url in entry["links"] + entry["images"]):
+        return True
+    return bool(image_attrs) and any(
+        rebase_url(url, basepath) in image_attrs for url in entry["images"]
+    )
+
+
+def markdown_to_cached_page(lines, cache, basepath, assets=None, image_attrs=None):
+    # Entries hold HTML rebased onto basepath but not fingerprinted, so a
+    # changed asset does not invalidate every block that links to it. The
+    # few blocks that link an asset or show a known image are rebuilt from
+    # their node tuple instead, so only real href, src and img nodes are
+    # rewritten, never text that happens to look like them.
+    reader = BlockReader(lines)
+    children = []
+    links = []
+    images = []
+    texts = []
+    blocks = []
+    summary = None
+    for block_type, block_lines in reader:
+        key = cache.key(block_lines, basepath)
+        entry = cache.get(key)
+        if entry is None:
+            node = lines_to_html_node(block_type, block_lines)
+            entry = node_references(node)
+            entry["text"] = node_text(node)
+            entry["ast"] = node_to_tuple(node)
+            entry["html"] = rebase_node(node, basepath).to_html()
+            cache.put(key, entry)
+        if needs_node(entry, basepath, assets, image_attrs):
+            children.append(rebase_node(tuple_to_node(entry["ast"]), basepath, assets))
+        else:
+            children.append(LeafNode(None, entry["html"]))
+        links.extend(entry["links"])
+        images.extend(entry["images"])
+        texts.append(entry["text"])
+        blocks.append(entry["ast"])
+        if summary is None and block_type == BlockType.PARAGRAPH:
+            summary = entry["text"]
+    if reader.title is None:
+        raise Exception("No title found")
+    info = {
+        "title": reader.title,
+        "links": links,
+        "images": images,
+        "text": " ".join(texts),
+        "summary": summary,
+        "blocks": blocks,
+    }
+    return ParentNode("div", children), info
@@ -0,0 +1,164 @@
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import json
+import os
+
+from atomic import atomic_write, write_json
+from static_sync import remove_file
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# bump whenever the layout of the compression index changes
+COMPRESS_FORMAT = 1
+COMPRESS_EXTENSIONS = (".html", ".css", ".js", ".mjs", ".json", ".xml", ".svg", ".txt")
+COMPRESSED_SUFFIXES = (".gz", ".br")
+
+
+def gzip_bytes(data):
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(data, 9, mtime=0)
+
+
+def compressors():
+    active = [(".gz", gzip_bytes)]
+    if brotli is not None:
+        active.append((".br", brotli.compress))
+    return active
+
+
+def is_compressible(path):
+    return path.lower().endswith(COMPRESS_EXTENSIONS)
+
+
+def source_signature(stat):
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def compress_file(path):
+    # Writes the compressed siblings of path and returns their paths along
+    # with the signature of the source they were made from. The source is
+    # stat'ed before it is read, so a write racing with this one leaves a
+    # signature that no longer matches.
+    signature = source_signature(os.stat(path))
+    with open(path, "rb") as f:
+        data = f.read()
+    written = []
+    for suffix, compress in compressors():
+        sibling = path + suffix
+        with atomic_write(sibling, "wb") as f:
+            f.write(compress(data))
+        written.append(sibling)
+    return written, signature
+
+
+class CompressionIndex:
+    # The [mtime_ns, size] of every source when its siblings were last
+    # written, keyed by its path relative to the output directory. Both are
+    # compared, so a source rewritten within one mtime tick, or copied in
+    # with its mtime preserved, is still compressed again.
+    def __init__(self, path, sources=None):
+        self.path = path
+        self.sources = sources if sources is not None else {}
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return cls(path)
+        if data.get("version") != COMPRESS_FORMAT:
+            return cls(path)
+        return cls(path, data.get("sources", {}))
+
+    def save(self):
+        write_json(
+            self.path,
+            {"version": COMPRESS_FORMAT, "sources": self.sources},
+            separators=(",", ":"),
+        )
+
+    def record(self, relpath, signature):
+        self.sources[relpath] = list(signature)
+
+    def is_current(self, relpath, stat):
+        return self.sources.get(relpath) == source_signature(stat)
+
+    def is_fresh(self, root, relpath, stat):
+        # current, and none of the active siblings has gone missing
+        return self.is_current(relpath, stat) and all(
+            os.path.exists(os.path.join(root, relpath + suffix))
+            for suffix, _ in compressors()
+        )
+
+
+def precompress_tree(root, index, workers=1, keep=(), force=()):
+    # Compresses every text file under root whose siblings are missing or
+    # stale according to index, on a thread pool since zlib releases the
+    # GIL, and removes the siblings whose source is gone. keep holds
+    # root-relative paths that are outputs in their own right, such as a
+    # .gz copied from static/; force holds paths to compress regardless.
+    # Updates index and returns the paths written and removed.
+    active = {suffix for suffix, _ in compressors()}
+    keep = set(keep)
+    force = {os.path.abspath(path) for path in force}
+    sources = []
+    seen = set()
+    removed = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            relpath = os.path.relpath(path, root)
+            if is_compressible(name):
+                seen.add(relpath)
+                if os.path.abspath(path) in force or not index.is_fresh(
+                    root, relpath, os.stat(path)
+                ):
+                    sources.append(path)
+                continue
+            source, suffix = os.path.splitext(path)
+            if suffix not in COMPRESSED_SUFFIXES or not is_compressible(source):
+                continue
+            if relpath in keep:
+                continue
+            if not os.path.exists(source) or (
+                suffix not in active
+                and not index.is_current(relpath[: -len(suffix)], os.stat(source))
+            ):
+                remove_file(path, root)
+                removed.append(path)
+    if workers > 1 and len(sources) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(compress_file, sources))
+    else:
+        results = [compress_file(path) for path in sources]
+    written = []
+    for path, (siblings, signature) in zip(sources, results):
+        index.record(os.path.relpath(path, root), signature)
+        written.extend(siblings)
+    for relpath in set(index.sources) - seen:
+        del index.sources[relpath]
+    return {"written": written, "removed": removed}
+
+
+def remove_compressed(root, keep=()):
+    # removes every compressed sibling under root, for builds that no
+    # longer precompress
+    keep = set(keep)
+    removed = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            source, suffix = os.path.splitext(path)
+            if (
+                suffix in COMPRESSED_SUFFIXES
+                and is_compressible(source)
+                and os.path.relpath(path, root) not in keep
+            ):
+                remove_file(path, root)
+                removed.append(path)
+    return removed
@@ -0,0 +1,123 @@
+import os
+from urllib.parse import urlsplit
+
+REBUILD_KINDS = ("source", "template", "assets")
+
+
+def node_references(node):
+    links = []
+    images = []
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current.props:
+            if current.tag == "a" and "href" in current.props:
+                links.append(current.props["href"])
+            elif current.tag == "img" and "src" in current.props:
+                images.append(current.props["src"])
+        if current.children:
+            stack.extend(reversed(current.children))
+    return {"links": links, "images": images}
+
+
+def site_path(url, page_url):
+    # Resolve a link or image URL against the page's URL. Returns the path
+    # within the site, or None for external, mailto: and fragment-only URLs.
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    path = parts.path
+    if not path.startswith("/"):
+        path = page_url.rsplit("/", 1)[0] + "/" + path
+    segments = []
+    for segment in path.split("/"):
+        if segment == "..":
+            if segments:
+                segments.pop()
+        elif segment not in ("", "."):
+            segments.append(segment)
+    resolved = "/" + "/".join(segments)
+    if path.endswith("/") and resolved != "/":
+        resolved += "/"
+    return resolved
+
+
+def page_url(content_dir, source_path):
+    relpath = os.path.relpath(source_path, content_dir).replace(os.sep, "/")
+    if relpath == "index.md":
+        return "/"
+    if relpath.endswith("/index.md"):
+        return "/" + relpath[: -len("index.md")]
+    return "/" + relpath[: -len(".md")] + ".html"
+
+
+def page_source_candidates(content_dir, path):
+    relpath = path.strip("/")
+    if relpath.endswith(".html"):
+        names = [relpath[: -len(".html")] + ".md"]
+    elif relpath == "" or path.endswith("/"):
+        names = [os.path.join(relpath, "index.md")]
+    else:
+        names = [os.path.join(relpath, "index.md"), relpath + ".md"]
+    return [os.path.join(content_dir, *name.split("/")) for name in names]
+
+
+def static_path(static_dir, path):
+    return os.path.join(static_dir, *path.strip("/").split("/"))
+
+
+def resolve_references(references, source_path, content_dir, static_dir):
+    url = page_url(content_dir, source_path)
+    assets = []
+    links = []
+    for target in references["images"]:
+        path = site_path(target, url)
+        if path is not None:
+            assets.append(static_path(static_dir, path))
+    for target in references["links"]:
+        path = site_path(target, url)
+        if path is None:
+            continue
+        asset = static_path(static_dir, path)
+        if os.path.isfile(asset):
+            # links to downloads such as PDFs kept in static/
+            assets.append(asset)
+            continue
+        candidates = page_source_candidates(content_dir, path)
+        existing = [c for c in candidates if os.path.isfile(c)]
+        links.append(existing[0] if existing else candidates[0])
+    return {"assets": sorted(set(assets)), "links": sorted(set(links))}
+
+
+class DependencyGraph:
+    # Read-only view over the manifest: every output records its source,
+    # template, the static assets it references and the page sources it
+    # links to, and the graph answers which outputs depend on a file.
+    def __init__(self, outputs):
+        self.outputs = outputs
+        self._dependents = {}
+        for dest_path, inputs in outputs.items():
+            for kind, path in self.dependencies(dest_path):
+                self._dependents.setdefault((kind, path), set()).add(dest_path)
+
+    def dependencies(self, dest_path):
+        inputs = self.outputs[dest_path]
+        yield "source", inputs["source"]["path"]
+        yield "template", inputs["template"]["path"]
+        for path in inputs.get("assets", []):
+            yield "assets", path
+        for path in inputs.get("links", []):
+            yield "links", path
+
+    def dependents(self, path, kinds=REBUILD_KINDS):
+        path = os.path.abspath(path)
+        found = set()
+        for kind in kinds:
+            found |= self._dependents.get((kind, path), set())
+        return found
+
+    def affected_outputs(self, changed_paths, kinds=REBUILD_KINDS):
+        affected = set()
+        for path in changed_paths:
+            affected |= self.dependents(path, kinds)
+        return affected
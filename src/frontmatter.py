@@ -0,0 +1,132 @@
+import itertools
+import json
+import os
+
+from atomic import write_json
+
+FRONT_MATTER_FENCE = "---"
+# bump whenever the cached metadata format or the front matter syntax changes
+METADATA_VERSION = 1
+
+
+def parse_value(text):
+    text = text.strip()
+    if text in ("true", "false"):
+        return text == "true"
+    if text.startswith("[") and text.endswith("]"):
+        items = [item for item in text[1:-1].split(",") if item.strip()]
+        return [parse_value(item) for item in items]
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'":
+        return text[1:-1]
+    return text
+
+
+def parse_front_matter(lines):
+    # Splits "key: value" lines fenced by "---" off the top of a page.
+    # Returns the metadata and an iterator over the remaining lines; only
+    # the front matter itself is consumed, so the body is never read here.
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return {}, lines
+    if first.strip() != FRONT_MATTER_FENCE:
+        return {}, itertools.chain([first], lines)
+    meta = {}
+    for line in lines:
+        if line.strip() == FRONT_MATTER_FENCE:
+            return meta, lines
+        key, sep, value = line.partition(":")
+        if not sep or not key.strip():
+            raise ValueError(f"invalid front matter line: {line.strip()!r}")
+        meta[key.strip()] = parse_value(value)
+    raise ValueError("front matter is not closed")
+
+
+def tag_text(value):
+    # parse_value turns true and false into bools; give them back as written
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def page_tags(meta):
+    # the page's tags as a list of strings, whether the front matter holds a
+    # list, a single tag or a bare true/false
+    tags = meta.get("tags", [])
+    if not isinstance(tags, list):
+        tags = [tags]
+    return [tag_text(tag) for tag in tags]
+
+
+def read_front_matter(path):
+    with open(path) as f:
+        return parse_front_matter(f)[0]
+
+
+class MetadataCache:
+    # Front matter of every page, keyed by source path and kept between
+    # builds. Entries are reused while the file's mtime and size match, so
+    # selecting pages by metadata does not even open unchanged files.
+    def __init__(self, path, entries=None):
+        self.path = path
+        self.entries = entries if entries is not None else {}
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return cls(path)
+        if data.get("version") != METADATA_VERSION:
+            return cls(path)
+        return cls(path, data.get("entries", {}))
+
+    def save(self):
+        write_json(
+            self.path,
+            {"version": METADATA_VERSION, "entries": self.entries},
+            indent=1,
+            sort_keys=True,
+        )
+
+    def get(self, path):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        entry = self.entries.get(path)
+        if (
+            entry is not None
+            and entry["mtime_ns"] == stat.st_mtime_ns
+            and entry["size"] == stat.st_size
+        ):
+            return entry["meta"]
+        meta = read_front_matter(path)
+        self.entries[path] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "meta": meta,
+        }
+        return meta
+
+    def prune(self):
+        for path in [path for path in self.entries if not os.path.exists(path)]:
+            del self.entries[path]
+
+
+def page_selector(metadata, drafts=False, exclude_tags=()):
+    # Returns select(source_path), which is False for pages that should not
+    # be built at all: drafts, unless drafts is set, and pages tagged with
+    # any of exclude_tags.
+    exclude_tags = set(exclude_tags)
+
+    def select(source_path):
+        try:
+            meta = metadata.get(source_path)
+        except ValueError:
+            # let the render step report the broken front matter
+            return True
+        if meta.get("draft") is True and not drafts:
+            return False
+        return not exclude_tags.intersection(page_tags(meta))
+
+    return select
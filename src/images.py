@@ -0,0 +1,543 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+import json
+import os
+import struct
+import zlib
+
+from atomic import temporary_path, write_json
+from htmlnode import LeafNode, ParentNode
+from manifest import file_digest
+from static_sync import remove_file, sync_file
+from template import rebase_url
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = features = None
+
+# bump whenever resized variants or the index format change
+IMAGE_FORMAT = 3
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+DEFAULT_WIDTHS = (480, 960)
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+# GIFs may be animated, and WebP sources need no second copy
+WEBP_SOURCES = (".png", ".jpg", ".jpeg")
+# the index entry fields listing the widths written of each kind of variant
+VARIANT_KINDS = ("variants", "webp")
+
+
+def png_size(data):
+    if data[:8] == PNG_SIGNATURE and data[12:16] == b"IHDR":
+        return struct.unpack(">II", data[16:24])
+    return None
+
+
+def gif_size(data):
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return struct.unpack("<HH", data[6:10])
+    return None
+
+
+def webp_size(data):
+    if data[:4] != b"RIFF" or data[8:12] != b"WEBP":
+        return None
+    chunk = data[12:16]
+    if chunk == b"VP8 " and data[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and data[20:21] == b"\x2f":
+        bits = int.from_bytes(data[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+        return width, height
+    return None
+
+
+def jpeg_size(f):
+    # walks the marker segments up to the first start-of-frame; None if the
+    # file ends before one
+    if f.read(2) != b"\xff\xd8":
+        return None
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        if marker[1] == 0xFF:
+            f.seek(-1, os.SEEK_CUR)
+            continue
+        if marker[1] in (0x01, 0xD8) or 0xD0 <= marker[1] <= 0xD7:
+            continue
+        data = f.read(2)
+        if len(data) < 2:
+            return None
+        length = struct.unpack(">H", data)[0]
+        if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack(">xHH", data)
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def image_size(path):
+    # (width, height) read from the file header, or None if unknown; a
+    # corrupt image just gets no dimensions rather than failing the build
+    try:
+        with open(path, "rb") as f:
+            data = f.read(32)
+            for reader in (png_size, gif_size, webp_size):
+                size = reader(data)
+                if size is not None:
+                    return size
+            f.seek(0)
+            return jpeg_size(f)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def paeth(a, b, c):
+    p = a + b - c
+    pa = abs(p - a)
+    pb = abs(p - b)
+    pc = abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    if pb <= pc:
+        return b
+    return c
+
+
+def unfilter_row(filter_type, row, previous, bpp):
+    if filter_type == 0:
+        return row
+    out = bytearray(row)
+    if filter_type == 1:
+        for i in range(bpp, len(out)):
+            out[i] = (out[i] + out[i - bpp]) & 0xFF
+    elif filter_type == 2:
+        out = bytearray((x + y) & 0xFF for x, y in zip(row, previous))
+    elif filter_type == 3:
+        for i in range(len(out)):
+            left = out[i - bpp] if i >= bpp else 0
+            out[i] = (out[i] + ((left + previous[i]) >> 1)) & 0xFF
+    elif filter_type == 4:
+        for i in range(len(out)):
+            if i >= bpp:
+                value = paeth(out[i - bpp], previous[i], previous[i - bpp])
+            else:
+                value = previous[i]
+            out[i] = (out[i] + value) & 0xFF
+    else:
+        raise ValueError(f"invalid PNG filter type {filter_type}")
+    return out
+
+
+def read_png(path):
+    # Decodes 8-bit, non-interlaced PNGs. Returns the header fields, the
+    # PLTE and tRNS chunks to carry over and one bytearray per row, or None
+    # for PNGs this decoder does not handle.
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:8] != PNG_SIGNATURE:
+        return None
+    pos = 8
+    header = None
+    extra = []
+    idat = []
+    while pos < len(data):
+        length, kind = struct.unpack(">I4s", data[pos : pos + 8])
+        body = data[pos + 8 : pos + 8 + length]
+        pos += 12 + length
+        if kind == b"IHDR":
+            header = struct.unpack(">IIBBBBB", body)
+        elif kind in (b"PLTE", b"tRNS"):
+            extra.append((kind, body))
+        elif kind == b"IDAT":
+            idat.append(body)
+        elif kind == b"IEND":
+            break
+    width, height, depth, color_type, _, _, interlace = header
+    if depth != 8 or interlace or color_type not in PNG_CHANNELS:
+        return None
+    channels = PNG_CHANNELS[color_type]
+    stride = width * channels
+    raw = zlib.decompress(b"".join(idat))
+    rows = []
+    previous = bytearray(stride)
+    for y in range(height):
+        start = y * (stride + 1)
+        row = raw[start + 1 : start + 1 + stride]
+        previous = unfilter_row(raw[start], row, previous, channels)
+        rows.append(previous)
+    return width, height, color_type, extra, rows
+
+
+def png_chunk(kind, body):
+    checksum = zlib.crc32(kind + body) & 0xFFFFFFFF
+    return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", checksum)
+
+
+def write_png(path, width, height, color_type, extra, rows):
+    filtered = []
+    previous = bytes(len(rows[0]))
+    for row in rows:
+        # the Up filter is cheap to compute here and compresses well
+        filtered.append(b"\x02" + bytes((x - y) & 0xFF for x, y in zip(row, previous)))
+        previous = row
+    header = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+    with open(path, "wb") as f:
+        f.write(PNG_SIGNATURE)
+        f.write(png_chunk(b"IHDR", header))
+        for kind, body in extra:
+            f.write(png_chunk(kind, body))
+        f.write(png_chunk(b"IDAT", zlib.compress(b"".join(filtered), 9)))
+        f.write(png_chunk(b"IEND", b""))
+
+
+def spans(size, new_size):
+    return [(i * size // new_size, (i + 1) * size // new_size) for i in range(new_size)]
+
+
+def resize_rows(rows, width, channels, new_width, new_height, average=True):
+    # Box filter: every output pixel is the mean of the source pixels it
+    # covers. Palette images pass average=False to pick a source pixel.
+    resized = []
+    for y0, y1 in spans(len(rows), new_height):
+        if average:
+            count = y1 - y0
+            row = [sum(column) // count for column in zip(*rows[y0:y1])]
+        else:
+            row = rows[y0]
+        out = bytearray()
+        for x0, x1 in spans(width, new_width):
+            for channel in range(channels):
+                start = x0 * channels + channel
+                if average:
+                    values = row[start : x1 * channels : channels]
+                    out.append(sum(values) // len(values))
+                else:
+                    out.append(row[start])
+        resized.append(out)
+    return resized
+
+
+def resize_png(src, variants):
+    # variants holds (dest, width, format) triples, all resized from one
+    # decode; only format None, the source's own, is supported here
+    image = read_png(src)
+    if image is None:
+        return False
+    width, height, color_type, extra, rows = image
+    for dest, new_width, _ in variants:
+        new_height = max(1, round(height * new_width / width))
+        resized = resize_rows(
+            rows,
+            width,
+            PNG_CHANNELS[color_type],
+            new_width,
+            new_height,
+            average=color_type != 3,
+        )
+        write_png(dest, new_width, new_height, color_type, extra, resized)
+    return True
+
+
+def webp_supported():
+    return Image is not None and features.check("webp")
+
+
+def resize_image(src, variants):
+    # Pillow handles every format when it is installed; without it PNGs are
+    # resized by the pure Python fallback above and other formats skipped.
+    # A variant's format is None for the source's own or e.g. "WEBP".
+    if Image is not None:
+        with Image.open(src) as image:
+            image.load()
+            for dest, new_width, image_format in variants:
+                output = image
+                if new_width != image.width:
+                    new_height = max(1, round(image.height * new_width / image.width))
+                    output = image.resize((new_width, new_height), Image.LANCZOS)
+                output.save(dest, format=image_format or image.format)
+        return True
+    if src.lower().endswith(".png") and all(
+        image_format is None for _, _, image_format in variants
+    ):
+        return resize_png(src, variants)
+    return False
+
+
+def resize_task(task):
+    # decodes the source once and writes every missing variant of it; a
+    # source that can't be resized leaves none of them behind
+    src, variants = task
+    try:
+        with ExitStack() as stack:
+            tmp_variants = [
+                (stack.enter_context(temporary_path(dest)), width, image_format)
+                for dest, width, image_format in variants
+            ]
+            if not resize_image(src, tmp_variants):
+                raise ValueError(f"unsupported image: {src}")
+    except Exception:
+        return False
+    return True
+
+
+def variant_path(relpath, width):
+    root, ext = os.path.splitext(relpath)
+    return f"{root}-{width}w{ext}"
+
+
+def webp_path(relpath, width, full_width):
+    # a.png.webp and a-480w.png.webp, so a.png and a.jpg never collide
+    if width == full_width:
+        return relpath + ".webp"
+    return variant_path(relpath, width) + ".webp"
+
+
+def annotate_images(node, images):
+    # Adds width, height and srcset to the img nodes of a page, and wraps
+    # those with WebP versions in a <picture> offering them first. Text is
+    # left alone, even where it reads like an <img> tag, e.g. in code
+    # blocks; the block cache hands over real nodes for blocks with known
+    # images.
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        for index, child in enumerate(current.children or ()):
+            if child.tag == "img" and child.props:
+                attrs = dict(images.get(child.props.get("src"), {}))
+                webp = attrs.pop("webp", None)
+                child.props.update(attrs)
+                if webp is not None:
+                    source = LeafNode(
+                        "source", "", {"type": "image/webp", "srcset": webp}
+                    )
+                    current.children[index] = ParentNode("picture", [source, child])
+            elif child.children:
+                stack.append(child)
+    return node
+
+
+class ImagePipeline:
+    # Reads the size of every image in static/ and writes resized variants
+    # next to it for srcset. Variants are stored in a content-addressed
+    # cache, so an image is only ever resized once per width, and the index
+    # of what each image produced lets unchanged images skip even hashing.
+    # With webp, and a Pillow build that writes WebP, PNGs and JPEGs also
+    # get WebP versions at every width and their own.
+    def __init__(
+        self, static_dir, output_dir, cache_dir, widths=DEFAULT_WIDTHS, webp=False
+    ):
+        self.static_dir = static_dir
+        self.output_dir = output_dir
+        self.cache_dir = cache_dir
+        self.widths = sorted(widths)
+        self.webp = webp and webp_supported()
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.entries = {}
+        self.settings_changed = False
+        try:
+            with open(self.index_path) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        # after a format bump or with other widths or WebP setting every
+        # image is processed again, and the variants the index lists removed
+        self.entries = data.get("images", {})
+        self.settings_changed = (
+            data.get("version") != IMAGE_FORMAT
+            or data.get("widths") != self.widths
+            or data.get("webp") != self.webp
+        )
+
+    def save(self):
+        write_json(
+            self.index_path,
+            {
+                "version": IMAGE_FORMAT,
+                "widths": self.widths,
+                "webp": self.webp,
+                "images": self.entries,
+            },
+            indent=1,
+            sort_keys=True,
+        )
+
+    def collect(self):
+        images = []
+        for dirpath, dirnames, filenames in os.walk(self.static_dir):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    path = os.path.join(dirpath, name)
+                    images.append(os.path.relpath(path, self.static_dir))
+        return images
+
+    def cache_path(self, sha256, width, ext):
+        return os.path.join(self.cache_dir, sha256[:2], f"{sha256}-{width}{ext}")
+
+    def is_smaller(self, cache_path, size):
+        # a variant that came out no smaller than its source, as the PNG
+        # fallback's output can, would only cost the browsers picking it
+        try:
+            return os.path.getsize(cache_path) < size
+        except FileNotFoundError:
+            return False
+
+    def entry(self, relpath):
+        # returns the index entry for an image and whether its content
+        # changed since the previous run
+        path = os.path.join(self.static_dir, relpath)
+        stat = os.stat(path)
+        previous = self.entries.get(relpath)
+        if self.settings_changed:
+            previous = None
+        if (
+            previous is not None
+            and previous["mtime_ns"] == stat.st_mtime_ns
+            and previous["size"] == stat.st_size
+        ):
+            return previous, False
+        sha256 = file_digest(path)
+        if previous is not None and previous["sha256"] == sha256:
+            previous.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            return previous, False
+        size = image_size(path)
+        entry = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": sha256,
+            "dimensions": list(size) if size is not None else None,
+            "variants": None,
+            "webp": None,
+        }
+        return entry, True
+
+    def variant_widths(self, relpath, entry, kind):
+        # the widths an image may get variants of the kind at: narrower
+        # than the image, plus its own width for WebP
+        full_width = entry["dimensions"][0]
+        widths = [width for width in self.widths if width < full_width]
+        if kind == "variants":
+            return widths
+        if self.webp and relpath.lower().endswith(WEBP_SOURCES):
+            return widths + [full_width]
+        return []
+
+    def variant_cache_path(self, relpath, entry, kind, width):
+        ext = ".webp" if kind == "webp" else os.path.splitext(relpath)[1]
+        return self.cache_path(entry["sha256"], width, ext)
+
+    def variant_output(self, relpath, entry, kind, width):
+        if kind == "webp":
+            path = webp_path(relpath, width, entry["dimensions"][0])
+        else:
+            path = variant_path(relpath, width)
+        return os.path.join(self.output_dir, path)
+
+    def kept_widths(self, relpath, entry, kind):
+        # the widths whose variant came out smaller than the source; WebP is
+        # only offered when the full-size copy is, since a <source> has to
+        # cover every width on its own
+        widths = [
+            width
+            for width in self.variant_widths(relpath, entry, kind)
+            if self.is_smaller(
+                self.variant_cache_path(relpath, entry, kind, width), entry["size"]
+            )
+        ]
+        if kind == "webp" and entry["dimensions"][0] not in widths:
+            return []
+        return widths
+
+    def run(self, basepath="/", workers=1):
+        # Returns the attributes to add to each image, keyed by its URL
+        # under basepath, the absolute paths of static images whose
+        # content changed and the output files written or removed.
+        entries = {}
+        changed = []
+        tasks = []
+        for relpath in self.collect():
+            entry, content_changed = self.entry(relpath)
+            entries[relpath] = entry
+            if content_changed:
+                changed.append(os.path.join(self.static_dir, relpath))
+            if entry["variants"] is not None or entry["dimensions"] is None:
+                continue
+            variants = []
+            for kind in VARIANT_KINDS:
+                image_format = "WEBP" if kind == "webp" else None
+                for width in self.variant_widths(relpath, entry, kind):
+                    cache_path = self.variant_cache_path(relpath, entry, kind, width)
+                    if not os.path.exists(cache_path):
+                        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                        variants.append((cache_path, width, image_format))
+            if variants:
+                tasks.append((os.path.join(self.static_dir, relpath), variants))
+        if workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(resize_task, tasks))
+        else:
+            for task in tasks:
+                resize_task(task)
+
+        written = []
+        outputs = set()
+        for relpath, entry in entries.items():
+            if entry["dimensions"] is None:
+                continue
+            if entry["variants"] is None:
+                for kind in VARIANT_KINDS:
+                    entry[kind] = self.kept_widths(relpath, entry, kind)
+            for kind in VARIANT_KINDS:
+                for width in entry[kind]:
+                    dest = self.variant_output(relpath, entry, kind, width)
+                    outputs.add(dest)
+                    cache_path = self.variant_cache_path(relpath, entry, kind, width)
+                    if sync_file(cache_path, dest):
+                        written.append(dest)
+        for relpath, entry in self.entries.items():
+            for kind in VARIANT_KINDS:
+                for width in entry.get(kind) or ():
+                    dest = self.variant_output(relpath, entry, kind, width)
+                    if dest not in outputs and remove_file(dest, self.output_dir):
+                        written.append(dest)
+        self.entries = entries
+        self.settings_changed = False
+        self.save()
+        return {
+            "images": self.attributes(basepath),
+            "changed": changed,
+            "written": written,
+        }
+
+    def attributes(self, basepath="/"):
+        images = {}
+        for relpath, entry in self.entries.items():
+            if entry["dimensions"] is None:
+                continue
+            url = rebase_url("/" + relpath.replace(os.sep, "/"), basepath)
+            width, height = entry["dimensions"]
+            attrs = {"width": width, "height": height}
+            if entry["variants"]:
+                candidates = [
+                    f"{variant_path(url, variant)} {variant}w"
+                    for variant in entry["variants"]
+                ]
+                candidates.append(f"{url} {width}w")
+                attrs["srcset"] = ", ".join(candidates)
+            if entry["webp"]:
+                # popped by annotate_images into a <source> element
+                attrs["webp"] = ", ".join(
+                    f"{webp_path(url, variant, width)} {variant}w"
+                    for variant in entry["webp"]
+                )
+            images[url] = attrs
+        return images
@@ -1,18 +1,68 @@
 import re
 
-from textnode import TextNode, TextType
+from textnode import TextNode, TextType, html_node
+
+
+DELIMITER_RE = re.compile(r"\*\*|_|`")
+INLINE_LINK_RE = re.compile(r"(!?)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+DELIMITER_TYPES = {"**": TextType.BOLD, "_": TextType.ITALIC, "`": TextType.CODE}
 
 
 def text_to_textnodes(text):
-    nodes = [TextNode(text, TextType.TEXT)]
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
+    return parse_inline(text, TextNode)
+
+
+def text_to_html_nodes(text):
+    return parse_inline(text, html_node)
+
+
+def parse_inline(text, make_node):
+    # Single left-to-right scan that yields the same nodes as splitting on
+    # "**", "_" and "`" in turn and then extracting images and links from
+    # what is left as plain text. A "**" always toggles bold, "_" is only
+    # special outside bold, and "`" only outside bold and italic. Each node
+    # is built by make_node(text, text_type, url=None), so the scan can emit
+    # TextNodes or LeafNodes without an intermediate list.
+    nodes = []
+    state = TextType.TEXT
+    start = 0
+    for match in DELIMITER_RE.finditer(text):
+        delimiter = match.group()
+        if state == TextType.TEXT:
+            append_text_nodes(nodes, text[start : match.start()], make_node)
+            state = DELIMITER_TYPES[delimiter]
+        elif DELIMITER_TYPES[delimiter] == state:
+            if match.start() > start:
+                nodes.append(make_node(text[start : match.start()], state))
+            state = TextType.TEXT
+        elif state == TextType.BOLD or (
+            state == TextType.ITALIC and delimiter == "`"
+        ):
+            continue
+        else:
+            raise ValueError("invalid markdown, formatted section not closed")
+        start = match.end()
+    if state != TextType.TEXT:
+        raise ValueError("invalid markdown, formatted section not closed")
+    append_text_nodes(nodes, text[start:], make_node)
     return nodes
 
 
+def append_text_nodes(nodes, text, make_node=TextNode):
+    pos = 0
+    if "[" in text:
+        for match in INLINE_LINK_RE.finditer(text):
+            if match.start() > pos:
+                nodes.append(make_node(text[pos : match.start()], TextType.TEXT))
+            if match.group(1):
+                nodes.append(make_node(match.group(2), TextType.IMAGE, match.group(3)))
+            else:
+                nodes.append(make_node(match.group(2), TextType.LINK, match.group(3)))
+            pos = match.end()
+    if pos < len(text):
+        nodes.append(make_node(text[pos:], TextType.TEXT))
+
+
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
     new_nodes = []
     for old_node in old_nodes:
@@ -0,0 +1,55 @@
+import os
+
+from depgraph import page_source_candidates, page_url, site_path, static_path
+
+
+class LinkChecker:
+    # Resolves the link and image URLs recorded in the manifest against the
+    # pages being generated and the files in static/, without reading any
+    # output. Lookups are memoized, since most pages share their targets.
+    def __init__(self, content_dir, static_dir, pages):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.pages = set(pages)
+        self._static = {}
+
+    def static_exists(self, path):
+        if path not in self._static:
+            self._static[path] = os.path.isfile(static_path(self.static_dir, path))
+        return self._static[path]
+
+    def page_exists(self, path):
+        candidates = page_source_candidates(self.content_dir, path)
+        return any(candidate in self.pages for candidate in candidates)
+
+    def broken(self, source_path, references):
+        url = page_url(self.content_dir, source_path)
+        broken = []
+        for kind in ("links", "images"):
+            for target in references[kind]:
+                path = site_path(target, url)
+                if path is None or self.static_exists(path):
+                    continue
+                if kind == "links" and self.page_exists(path):
+                    continue
+                broken.append((kind, target))
+        return broken
+
+
+def find_broken_references(outputs, content_dir, static_dir, extra_pages=()):
+    # outputs is the manifest's map of output path to recorded inputs and
+    # extra_pages the source paths of pages generated without one; returns
+    # (source path, "links" or "images", url) for every reference that
+    # resolves to neither a generated page nor a static file
+    pages = {inputs["source"]["path"] for inputs in outputs.values()}
+    pages.update(extra_pages)
+    checker = LinkChecker(content_dir, static_dir, pages)
+    broken = []
+    for dest_path in sorted(outputs):
+        inputs = outputs[dest_path]
+        if "references" not in inputs:
+            continue
+        source_path = inputs["source"]["path"]
+        for kind, target in checker.broken(source_path, inputs["references"]):
+            broken.append((source_path, kind, target))
+    return broken
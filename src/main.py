@@ -1,73 +1,312 @@
+import argparse
 import os
-from pathlib import Path
-import re
-import shutil
 import sys
-from markdown_blocks import extract_title, markdown_to_html_node
+import time
+from block_cache import DEFAULT_MAX_BYTES
+from images import DEFAULT_WIDTHS
+from profiler import NULL_PROFILER, Profiler
+from site_builder import SiteBuilder
+from watch import serve_directory, watch
 
 
-def copy_directory(src, dest):
-    for name in os.listdir(src):
-        fullname = os.path.join(src, name)
-        if os.path.isfile(fullname):
-            shutil.copy(fullname, dest)
+def print_change_stats(stats, started):
+    elapsed = (time.perf_counter() - started) * 1000
+    print(
+        f"{stats['rendered']} pages rendered, {stats['copied']} files copied, "
+        f"{stats['removed']} removed in {elapsed:.0f}ms"
+    )
+    for error in stats["errors"]:
+        print(f"  {error}")
 
-        else:
-            new_dir = os.path.join(dest, name)
-            os.mkdir(new_dir)
-            copy_directory(fullname, new_dir)
 
+def print_broken_references(builder):
+    broken = builder.broken_references()
+    if not broken:
+        return
+    print(f"{len(broken)} broken references:")
+    for source_path, kind, target in broken:
+        kind = "image" if kind == "images" else "link"
+        print(f"  {os.path.relpath(source_path)}: {kind} {target}")
 
-def copy_static_content(static_dir, public_dir):
-    try:
-        shutil.rmtree(public_dir)
-    except FileNotFoundError:
-        pass
-    os.mkdir(public_dir)
-    copy_directory(static_dir, public_dir)
 
+def write_changed_list(path, changed):
+    # docs/-relative paths with forward slashes, one per line, for rsync
+    # --files-from or a CDN invalidation request
+    with open(path, "w") as f:
+        for relpath in changed:
+            f.write(relpath.replace(os.sep, "/") + "\n")
 
-def generate_page(from_path, dest_path, template_path, basepath):
-    markdown = Path(from_path).read_text()
-    output = Path(template_path).read_text()
-    content = markdown_to_html_node(markdown).to_html()
-    title = extract_title(markdown)
 
-    output = re.sub(r".*\{\{ Title \}\}.*", title, output)
-    output = re.sub(r".*\{\{ Content \}\}.*", content, output)
-    output = re.sub(r'href="/', f'href="{basepath}', output)
-    output = re.sub(r'src="/', f'src="{basepath}', output)
+def write_profile(profiler, args):
+    if profiler.enabled:
+        profiler.print_summary(args.profile_top)
+        profiler.write_json(args.profile_output)
 
-    Path(dest_path).write_text(output)
 
+def rebuild_site(builder, changed_paths):
+    started = time.perf_counter()
+    stats = builder.rebuild(changed_paths)
+    print_change_stats(stats, started)
+    print_broken_references(builder)
+    return stats
 
-def generate_pages(src, dest, template_path, basepath):
-    for name in os.listdir(src):
-        fullname = os.path.join(src, name)
-        dest_name = os.path.join(dest, name)
-        if os.path.isfile(fullname):
-            generate_page(
-                fullname, dest_name.replace(".md", ".html"), template_path, basepath
-            )
-        else:
-            os.mkdir(dest_name)
-            generate_pages(fullname, dest_name, template_path, basepath)
 
+def watch_site(builder):
+    watch(
+        [builder.content_dir, builder.static_dir, builder.template_path],
+        lambda changed: rebuild_site(builder, changed),
+    )
+
+
+def parse_widths(text):
+    return [int(width) for width in text.split(",")]
 
-def main():
-    basepath = "/"
-    print(len(sys.argv))
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build the static site.")
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="ignore the build manifest and rebuild every page",
+    )
+    parser.add_argument(
+        "--sync-compare",
+        choices=["mtime", "hash"],
+        default="mtime",
+        help="how to detect changed static files (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--hardlink",
+        action="store_true",
+        help="hardlink static files into docs/ instead of copying them",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="render every block from markdown instead of the block cache",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help="block cache size limit in MiB (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=1,
+        help="render pages on this many processes (0 uses every CPU core)",
+    )
+    parser.add_argument(
+        "--io-threads",
+        type=int,
+        default=0,
+        help="prefetch sources and write outputs on this many threads per "
+        "rendering process (default: read and write inline)",
+    )
+    parser.add_argument(
+        "--write-if-changed",
+        action="store_true",
+        help="leave pages whose HTML is unchanged untouched on disk",
+    )
+    parser.add_argument(
+        "--changed-list",
+        help="write the docs/-relative paths of every changed output here",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="time each build stage and page and write a JSON report",
+    )
+    parser.add_argument(
+        "--profile-output",
+        default=os.path.join(".build-cache", "profile.json"),
+        help="where --profile writes its report (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        help="number of slowest pages --profile prints (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--search-index",
+        action="store_true",
+        help="write an inverted index of page text to docs/search/ for "
+        "client-side search",
+    )
+    parser.add_argument(
+        "--site-url",
+        help="absolute site URL, e.g. https://example.com; writes sitemap.xml "
+        "and feed.xml",
+    )
+    parser.add_argument(
+        "--feed-section",
+        default="/blog/",
+        help="URL prefix of the pages listed in feed.xml (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--listings",
+        action="store_true",
+        help="write an index page for every directory without an index.md",
+    )
+    parser.add_argument(
+        "--drafts",
+        action="store_true",
+        help="also build pages marked draft: true in their front matter",
+    )
+    parser.add_argument(
+        "--exclude-tag",
+        action="append",
+        default=[],
+        metavar="TAG",
+        help="skip pages whose front matter tags include TAG (repeatable)",
+    )
+    parser.add_argument(
+        "--images",
+        action="store_true",
+        help="add width, height and srcset to images and write resized "
+        "variants of the images in static/",
+    )
+    parser.add_argument(
+        "--image-widths",
+        type=parse_widths,
+        default=list(DEFAULT_WIDTHS),
+        help="comma separated widths of the --images variants "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--webp",
+        action="store_true",
+        help="with --images and Pillow installed, also write WebP versions of "
+        "PNGs and JPEGs and offer them first through <picture>",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="write stylesheets, scripts and fonts under content-hashed names "
+        "and link those, so they can be cached indefinitely",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="minify the HTML of the template and the stylesheets",
+    )
+    parser.add_argument(
+        "--precompress",
+        action="store_true",
+        help="write .gz siblings, and .br ones when the brotli module is "
+        "installed, of the HTML, CSS and other text outputs",
+    )
+    parser.add_argument(
+        "--snapshots",
+        action="store_true",
+        help="keep the parsed tree of every page in .build-cache/ast/, so "
+        "pages whose source is unchanged are rendered without parsing",
+    )
+    parser.add_argument(
+        "--changed",
+        nargs="+",
+        metavar="PATH",
+        help="only rebuild the outputs that depend on these files, using the "
+        "dependency graph recorded by the previous build",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="rebuild changed pages and serve docs/ until interrupted",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8888,
+        help="port for the --watch development server (default: %(default)s)",
+    )
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    profiler = Profiler() if args.profile else NULL_PROFILER
     cwd = os.getcwd()
-    static_dir = os.path.join(cwd, "static")
-    docs_dir = os.path.join(cwd, "docs")
-    copy_static_content(static_dir, docs_dir)
+    builder = SiteBuilder(
+        os.path.join(cwd, "content"),
+        os.path.join(cwd, "static"),
+        os.path.join(cwd, "template.html"),
+        os.path.join(cwd, "docs"),
+        args.basepath,
+        cache_dir=os.path.join(cwd, ".build-cache"),
+        clean=args.clean,
+        workers=args.workers,
+        io_threads=args.io_threads,
+        block_cache=not args.no_cache,
+        cache_size=args.cache_size * 1024 * 1024,
+        write_if_changed=args.write_if_changed,
+        sync_compare=args.sync_compare,
+        hardlink=args.hardlink,
+        search_index=args.search_index,
+        site_url=args.site_url,
+        feed_section=args.feed_section,
+        listings=args.listings,
+        drafts=args.drafts,
+        exclude_tags=args.exclude_tag,
+        images=args.images,
+        image_widths=args.image_widths,
+        webp=args.webp,
+        fingerprint=args.fingerprint,
+        minify=args.minify,
+        precompress=args.precompress,
+        snapshots=args.snapshots,
+        profiler=profiler,
+    )
+    # without a previous build there is no dependency graph to consult, so
+    # --changed falls back to a full build
+    if args.changed and builder.manifest.outputs:
+        stats = rebuild_site(builder, args.changed)
+        print(f"{len(stats['changed'])} outputs changed")
+        if args.changed_list:
+            write_changed_list(args.changed_list, stats["changed"])
+        write_profile(profiler, args)
+        if stats["errors"]:
+            sys.exit(1)
+        return
 
-    content_dir = os.path.join(cwd, "content")
-    template_path = os.path.join(cwd, "template.html")
-    generate_pages(content_dir, docs_dir, template_path, basepath)
+    result = builder.build()
+    sync_stats = result["static"]
+    stats = result["pages"]
+    print(
+        f"{sync_stats['copied']} static files copied, "
+        f"{sync_stats['skipped']} skipped, {sync_stats['removed']} removed"
+    )
+    print(
+        f"{stats['rendered']} pages rendered, {stats['skipped']} up to date, "
+        f"{stats['excluded']} excluded, {len(result['removed'])} removed"
+    )
+    print(f"{len(result['changed'])} outputs changed")
+    if args.changed_list:
+        write_changed_list(args.changed_list, result["changed"])
+    with profiler.stage("check_links"):
+        print_broken_references(builder)
+    if stats["errors"]:
+        print(f"{len(stats['errors'])} pages failed:")
+        for error in stats["errors"]:
+            print(f"  {error}")
+    write_profile(profiler, args)
+    if args.watch:
+        serve_directory(builder.output_dir, args.port, basepath=builder.basepath)
+        print(
+            f"Serving {builder.output_dir} at "
+            f"http://127.0.0.1:{args.port}{builder.basepath}"
+        )
+        try:
+            watch_site(builder)
+        except KeyboardInterrupt:
+            pass
+    elif stats["errors"]:
+        sys.exit(1)
 
 
-main()
+if __name__ == "__main__":
+    main()
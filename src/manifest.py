@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+
+from atomic import write_json
+
+# bump whenever the manifest format or the rendered HTML changes, so old
+# builds are not mistaken for fresh ones
+MANIFEST_VERSION = 6
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    def __init__(self, path, outputs=None, static=None, generated=None):
+        self.path = path
+        self.outputs = outputs if outputs is not None else {}
+        self.static = static if static is not None else []
+        # docs/-relative paths of files built from the page index
+        self.generated = generated if generated is not None else []
+        self.start_build()
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return cls(path)
+        if data.get("version") != MANIFEST_VERSION:
+            return cls(path)
+        return cls(
+            path,
+            data.get("outputs", {}),
+            data.get("static", []),
+            data.get("generated", []),
+        )
+
+    def save(self):
+        write_json(
+            self.path,
+            {
+                "version": MANIFEST_VERSION,
+                "outputs": self.outputs,
+                "static": self.static,
+                "generated": self.generated,
+            },
+            indent=1,
+            sort_keys=True,
+        )
+
+    def start_build(self):
+        # forget the outputs seen and files fingerprinted by an earlier build
+        # in the same process
+        self.seen = set()
+        self._fingerprints = {}
+        self._previous = {}
+        for inputs in self.outputs.values():
+            for name in ("source", "template"):
+                self._previous[inputs[name]["path"]] = inputs[name]
+
+    def fingerprint(self, path):
+        # mtime and size are trusted when they match the previous build, so
+        # unchanged files are never re-read just to be hashed again
+        path = os.path.abspath(path)
+        if path in self._fingerprints:
+            return self._fingerprints[path]
+        stat = os.stat(path)
+        previous = self._previous.get(path)
+        if (
+            previous is not None
+            and previous["mtime_ns"] == stat.st_mtime_ns
+            and previous["size"] == stat.st_size
+        ):
+            sha256 = previous["sha256"]
+        else:
+            sha256 = file_digest(path)
+        fingerprint = {
+            "path": path,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": sha256,
+        }
+        self._fingerprints[path] = fingerprint
+        return fingerprint
+
+    def invalidate(self, paths):
+        for path in paths:
+            self._fingerprints.pop(os.path.abspath(path), None)
+
+    def page_inputs(self, source_path, template_path, basepath, options=None):
+        # options holds the build settings that change the rendered HTML
+        return {
+            "source": self.fingerprint(source_path),
+            "template": self.fingerprint(template_path),
+            "basepath": basepath,
+            "options": options or {},
+        }
+
+    def is_fresh(self, dest_path, inputs):
+        dest_path = os.path.abspath(dest_path)
+        self.seen.add(dest_path)
+        previous = self.outputs.get(dest_path)
+        if previous is None or not os.path.exists(dest_path):
+            return False
+        return (
+            previous["basepath"] == inputs["basepath"]
+            and previous.get("options", {}) == inputs["options"]
+            and _same_file(previous["source"], inputs["source"])
+            and _same_file(previous["template"], inputs["template"])
+        )
+
+    def record(self, dest_path, inputs):
+        dest_path = os.path.abspath(dest_path)
+        self.seen.add(dest_path)
+        self.outputs[dest_path] = inputs
+
+    def discard(self, dest_path):
+        dest_path = os.path.abspath(dest_path)
+        self.seen.discard(dest_path)
+        self.outputs.pop(dest_path, None)
+
+    def prune(self):
+        removed = []
+        for dest_path in sorted(self.outputs):
+            if dest_path in self.seen:
+                continue
+            del self.outputs[dest_path]
+            try:
+                os.remove(dest_path)
+            except FileNotFoundError:
+                pass
+            removed.append(dest_path)
+        return removed
+
+
+def _same_file(previous, current):
+    return (
+        previous["path"] == current["path"]
+        and previous["sha256"] == current["sha256"]
+    )
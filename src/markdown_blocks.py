@@ -1,8 +1,11 @@
 from enum import Enum
 
 from htmlnode import ParentNode
-from inline_markdown import text_to_textnodes
-from textnode import text_node_to_html_node, TextNode, TextType
+from inline_markdown import text_to_html_nodes
+from textnode import html_node, TextType
+
+# bump whenever the HTML produced for a block changes; it keys the block cache
+PARSER_VERSION = 1
 
 
 class BlockType(Enum):
@@ -14,35 +17,75 @@ class BlockType(Enum):
     ULIST = "unordered_list"
 
 
+class BlockReader:
+    # Groups lines into blocks separated by empty lines, classifying each
+    # block once. Lines may come from an open file, so the document is never
+    # held in memory as a whole; the first "# " line is kept as the title.
+    def __init__(self, lines):
+        self.lines = lines
+        self.title = None
+
+    def __iter__(self):
+        block = []
+        for line in self.lines:
+            if line.endswith("\n"):
+                line = line[:-1]
+            if self.title is None and line.startswith("# "):
+                self.title = line[2:]
+            if line != "":
+                block.append(line)
+                continue
+            if block:
+                lines = trim_block(block)
+                if lines:
+                    yield lines_to_block_type(lines), lines
+                block = []
+        if block:
+            lines = trim_block(block)
+            if lines:
+                yield lines_to_block_type(lines), lines
+
+
+def trim_block(lines):
+    start = 0
+    end = len(lines)
+    while start < end and lines[start].strip() == "":
+        start += 1
+    while end > start and lines[end - 1].strip() == "":
+        end -= 1
+    if start == end:
+        return []
+    lines = lines[start:end]
+    lines[0] = lines[0].lstrip()
+    lines[-1] = lines[-1].rstrip()
+    return lines
+
+
 def markdown_to_blocks(markdown):
-    blocks = markdown.split("\n\n")
-    filtered_blocks = []
-    for block in blocks:
-        if block == "":
-            continue
-        block = block.strip()
-        filtered_blocks.append(block)
-    return filtered_blocks
+    return ["\n".join(lines) for _, lines in BlockReader(markdown.split("\n"))]
 
 
 def block_to_block_type(block):
-    lines = block.split("\n")
+    return lines_to_block_type(block.split("\n"))
 
-    if block.startswith(("# ", "## ", "### ", "#### ", "##### ", "###### ")):
+
+def lines_to_block_type(lines):
+    first = lines[0]
+    if first.startswith(("# ", "## ", "### ", "#### ", "##### ", "###### ")):
         return BlockType.HEADING
-    if len(lines) > 1 and lines[0].startswith("```") and lines[-1].startswith("```"):
+    if len(lines) > 1 and first.startswith("```") and lines[-1].startswith("```"):
         return BlockType.CODE
-    if block.startswith(">"):
+    if first.startswith(">"):
         for line in lines:
             if not line.startswith(">"):
                 return BlockType.PARAGRAPH
         return BlockType.QUOTE
-    if block.startswith("- "):
+    if first.startswith("- "):
         for line in lines:
             if not line.startswith("- "):
                 return BlockType.PARAGRAPH
         return BlockType.ULIST
-    if block.startswith("1. "):
+    if first.startswith("1. "):
         i = 1
         for line in lines:
             if not line.startswith(f"{i}. "):
@@ -53,42 +96,51 @@ def block_to_block_type(block):
 
 
 def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
+    return blocks_to_html_node(BlockReader(markdown.split("\n")))
+
+
+def markdown_to_page(lines):
+    reader = BlockReader(lines)
+    node = blocks_to_html_node(reader)
+    if reader.title is None:
+        raise Exception("No title found")
+    return node, reader.title
+
+
+def blocks_to_html_node(blocks):
     children = []
-    for block in blocks:
-        html_node = block_to_html_node(block)
+    for block_type, lines in blocks:
+        html_node = lines_to_html_node(block_type, lines)
         children.append(html_node)
     return ParentNode("div", children, None)
 
 
 def block_to_html_node(block):
-    block_type = block_to_block_type(block)
+    lines = block.split("\n")
+    return lines_to_html_node(lines_to_block_type(lines), lines)
+
+
+def lines_to_html_node(block_type, lines):
     if block_type == BlockType.PARAGRAPH:
-        return paragraph_to_html_node(block)
+        return paragraph_to_html_node(lines)
     if block_type == BlockType.HEADING:
-        return heading_to_html_node(block)
+        return heading_to_html_node("\n".join(lines))
     if block_type == BlockType.CODE:
-        return code_to_html_node(block)
+        return code_to_html_node("\n".join(lines))
     if block_type == BlockType.OLIST:
-        return olist_to_html_node(block)
+        return olist_to_html_node(lines)
     if block_type == BlockType.ULIST:
-        return ulist_to_html_node(block)
+        return ulist_to_html_node(lines)
     if block_type == BlockType.QUOTE:
-        return quote_to_html_node(block)
+        return quote_to_html_node(lines)
     raise ValueError("invalid block type")
 
 
 def text_to_children(text):
-    text_nodes = text_to_textnodes(text)
-    children = []
-    for text_node in text_nodes:
-        html_node = text_node_to_html_node(text_node)
-        children.append(html_node)
-    return children
+    return text_to_html_nodes(text)
 
 
-def paragraph_to_html_node(block):
-    lines = block.split("\n")
+def paragraph_to_html_node(lines):
     paragraph = " ".join(lines)
     children = text_to_children(paragraph)
     return ParentNode("p", children)
@@ -112,14 +164,12 @@ def code_to_html_node(block):
     if not block.startswith("```") or not block.endswith("```"):
         raise ValueError("invalid code block")
     text = block[4:-3]
-    raw_text_node = TextNode(text, TextType.TEXT)
-    child = text_node_to_html_node(raw_text_node)
+    child = html_node(text, TextType.TEXT)
     code = ParentNode("code", [child])
     return ParentNode("pre", [code])
 
 
-def olist_to_html_node(block):
-    items = block.split("\n")
+def olist_to_html_node(items):
     html_items = []
     for item in items:
         text = item[3:]
@@ -128,8 +178,7 @@ def olist_to_html_node(block):
     return ParentNode("ol", html_items)
 
 
-def ulist_to_html_node(block):
-    items = block.split("\n")
+def ulist_to_html_node(items):
     html_items = []
     for item in items:
         text = item[2:]
@@ -138,8 +187,7 @@ def ulist_to_html_node(block):
     return ParentNode("ul", html_items)
 
 
-def quote_to_html_node(block):
-    lines = block.split("\n")
+def quote_to_html_node(lines):
     new_lines = []
     for line in lines:
         if not line.startswith(">"):
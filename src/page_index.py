@@ -0,0 +1,146 @@
+from datetime import date, datetime, timezone
+from email.utils import formatdate
+import os
+import time
+from xml.sax.saxutils import escape
+
+from depgraph import page_url
+from frontmatter import page_tags
+from htmlnode import LeafNode, ParentNode
+
+SUMMARY_LENGTH = 280
+FEED_ITEMS = 20
+
+
+def summarize(text, length=SUMMARY_LENGTH):
+    text = " ".join(text.split())
+    if len(text) <= length:
+        return text
+    return text[:length].rsplit(" ", 1)[0] + "…"
+
+
+def published_time(meta, mtime):
+    # the front matter date, as a UTC timestamp, or the source mtime
+    try:
+        published = date.fromisoformat(str(meta["date"])[:10])
+    except (KeyError, ValueError):
+        return mtime
+    return datetime(*published.timetuple()[:3], tzinfo=timezone.utc).timestamp()
+
+
+def build_page_index(outputs, content_dir):
+    # One entry per rendered page, built from what the manifest recorded
+    # when the page was last rendered, so nothing is parsed again.
+    pages = []
+    for dest_path, inputs in outputs.items():
+        if "title" not in inputs:
+            continue
+        source = inputs["source"]
+        meta = inputs.get("meta", {})
+        mtime = source["mtime_ns"] / 1e9
+        pages.append(
+            {
+                "url": page_url(content_dir, source["path"]),
+                "source": source["path"],
+                "dest": dest_path,
+                "title": inputs["title"],
+                "summary": inputs.get("summary"),
+                "size": source["size"],
+                "mtime": mtime,
+                "published": published_time(meta, mtime),
+                "tags": page_tags(meta),
+                "meta": meta,
+            }
+        )
+    pages.sort(key=lambda page: page["url"])
+    return pages
+
+
+def absolute_url(site_url, basepath, url):
+    return site_url.rstrip("/") + basepath.rstrip("/") + url
+
+
+def sitemap_xml(pages, site_url, basepath="/"):
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+    ]
+    for page in pages:
+        lines.append("  <url>")
+        loc = escape(absolute_url(site_url, basepath, page["url"]))
+        lines.append(f"    <loc>{loc}</loc>")
+        if page.get("mtime") is not None:
+            lastmod = time.strftime("%Y-%m-%d", time.gmtime(page["mtime"]))
+            lines.append(f"    <lastmod>{lastmod}</lastmod>")
+        lines.append("  </url>")
+    lines.append("</urlset>")
+    return "\n".join(lines) + "\n"
+
+
+def rss_feed(pages, site_url, basepath="/", title="", limit=FEED_ITEMS):
+    items = sorted(pages, key=lambda page: page["published"], reverse=True)
+    items = items[:limit]
+    home = escape(absolute_url(site_url, basepath, "/"))
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<rss version="2.0">',
+        "  <channel>",
+        f"    <title>{escape(title)}</title>",
+        f"    <link>{home}</link>",
+        f"    <description>{escape(title)}</description>",
+    ]
+    for page in items:
+        link = escape(absolute_url(site_url, basepath, page["url"]))
+        lines.append("    <item>")
+        lines.append(f"      <title>{escape(page['title'])}</title>")
+        lines.append(f"      <link>{link}</link>")
+        lines.append(f"      <guid>{link}</guid>")
+        pub_date = formatdate(page["published"], usegmt=True)
+        lines.append(f"      <pubDate>{pub_date}</pubDate>")
+        if page["summary"]:
+            summary = escape(page["summary"])
+            lines.append(f"      <description>{summary}</description>")
+        lines.append("    </item>")
+    lines.append("  </channel>")
+    lines.append("</rss>")
+    return "\n".join(lines) + "\n"
+
+
+def section_url(url):
+    return url.rstrip("/").rsplit("/", 1)[0] + "/"
+
+
+def listing_sections(pages):
+    # URL of every directory that holds pages but has no index.md of its
+    # own, mapped to the pages directly inside it, newest first
+    urls = {page["url"] for page in pages}
+    sections = {}
+    for page in pages:
+        if page["url"] == "/":
+            continue
+        parent = section_url(page["url"])
+        if parent not in urls:
+            sections.setdefault(parent, []).append(page)
+    for section_pages in sections.values():
+        section_pages.sort(key=lambda page: page["published"], reverse=True)
+    return sections
+
+
+def listing_node(pages):
+    items = []
+    for page in pages:
+        link = LeafNode("a", page["title"], {"href": page["url"]})
+        children = [ParentNode("h2", [link])]
+        if page["summary"]:
+            children.append(LeafNode("p", page["summary"]))
+        items.append(ParentNode("li", children))
+    return ParentNode("ul", items)
+
+
+def listing_title(url):
+    name = url.rstrip("/").rsplit("/", 1)[-1]
+    return name.replace("-", " ").replace("_", " ").title() or "Index"
+
+
+def listing_dest(dest_dir, url):
+    return os.path.join(dest_dir, *url.strip("/").split("/"), "index.html")
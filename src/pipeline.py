@@ -0,0 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import threading
+
+_DONE = object()
+
+
+def run_pipeline(jobs, read, render, write, prefetch=8, writers=4):
+    # A reader thread runs read(job) ahead of the caller, which runs
+    # render(job, data) and hands the result to a pool of writer threads
+    # running write(job, output). At most `prefetch` sources are waiting to
+    # be rendered and at most `prefetch` outputs are waiting to be written,
+    # so memory stays bounded however many jobs there are.
+    #
+    # Returns (job, result, error) for every job in order, where result is
+    # what write returned and error is the first exception raised for it.
+    sources = queue.Queue(maxsize=prefetch)
+
+    def reader():
+        for job in jobs:
+            try:
+                sources.put((job, read(job), None))
+            except Exception as e:
+                sources.put((job, None, e))
+        sources.put(_DONE)
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    pending_writes = threading.BoundedSemaphore(prefetch)
+    outcomes = []
+    with ThreadPoolExecutor(max_workers=writers) as pool:
+        while True:
+            item = sources.get()
+            if item is _DONE:
+                break
+            job, data, error = item
+            if error is None:
+                try:
+                    output = render(job, data)
+                except Exception as e:
+                    error = e
+            if error is not None:
+                outcomes.append((job, None, error))
+                continue
+            pending_writes.acquire()
+            future = pool.submit(write, job, output)
+            future.add_done_callback(lambda _: pending_writes.release())
+            outcomes.append((job, future, None))
+    thread.join()
+
+    results = []
+    for job, future, error in outcomes:
+        if future is None:
+            results.append((job, None, error))
+        elif future.exception() is not None:
+            results.append((job, None, future.exception()))
+        else:
+            results.append((job, future.result(), None))
+    return results
@@ -0,0 +1,98 @@
+from contextlib import contextmanager, nullcontext
+import json
+import os
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class NullProfiler:
+    enabled = False
+
+    def stage(self, name):
+        return nullcontext()
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class Profiler:
+    enabled = True
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.pages = {}
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name, seconds, calls=1):
+        stage = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0})
+        stage["calls"] += calls
+        stage["seconds"] += seconds
+
+    def merge(self, stages):
+        for name, stage in stages.items():
+            self.add(name, stage["seconds"], stage["calls"])
+
+    def add_page(self, path, seconds, stages):
+        self.pages[path] = {"seconds": seconds, "stages": stages}
+        self.merge(stages)
+
+    def slowest_pages(self, count):
+        pages = sorted(self.pages.items(), key=lambda item: -item[1]["seconds"])
+        return pages[:count]
+
+    def report(self):
+        return {
+            "total_seconds": self.elapsed(),
+            "peak_memory_kib": peak_memory_kib(),
+            "stages": dict(sorted(self.stages.items())),
+            "pages": dict(sorted(self.pages.items())),
+        }
+
+    def write_json(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=1)
+
+    def print_summary(self, top=10):
+        report = self.report()
+        print(f"Build took {report['total_seconds'] * 1000:.1f}ms")
+        for name, stage in report["stages"].items():
+            print(
+                f"  {name:<20} {stage['seconds'] * 1000:10.1f}ms "
+                f"{stage['calls']:8} calls"
+            )
+        memory = report["peak_memory_kib"]
+        if memory is not None:
+            print(
+                f"Peak memory: {memory['main']} KiB main, "
+                f"{memory['workers']} KiB largest worker"
+            )
+        if self.pages:
+            print(f"Slowest {min(top, len(self.pages))} pages:")
+            for path, page in self.slowest_pages(top):
+                print(f"  {page['seconds'] * 1000:10.1f}ms  {path}")
+
+
+def peak_memory_kib():
+    if resource is None:
+        return None
+    # ru_maxrss is reported in KiB on Linux and in bytes on macOS
+    scale = 1024 if os.uname().sysname == "Darwin" else 1
+    main = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale
+    workers = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale
+    return {"main": main, "workers": workers}
@@ -0,0 +1,122 @@
+import json
+import os
+import re
+
+from atomic import write_json
+from static_sync import remove_file, write_text_if_changed
+
+# bump whenever the layout of the files written to docs/ changes
+SEARCH_FORMAT = 1
+TOKEN_RE = re.compile(r"\w+")
+
+
+def node_text(node):
+    parts = []
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current.value:
+            parts.append(current.value)
+        if current.children:
+            stack.extend(reversed(current.children))
+    return " ".join(parts)
+
+
+def tokenize(text):
+    # term -> word positions in the page, positions delta encoded so the
+    # numbers stay small in the JSON written for the browser
+    terms = {}
+    last = {}
+    for position, match in enumerate(TOKEN_RE.finditer(text.lower())):
+        term = match.group()
+        terms.setdefault(term, []).append(position - last.get(term, 0))
+        last[term] = position
+    return terms
+
+
+def shard_name(term):
+    first = term[0]
+    if "a" <= first <= "z" or "0" <= first <= "9":
+        return first
+    return "_"
+
+
+class SearchIndex:
+    # Per-page postings kept between builds, so only re-rendered pages are
+    # tokenized again. write() merges them into an inverted index sharded
+    # by the first character of each term: search/index.json lists the
+    # pages and shards, and search/<shard>.json maps every term to a flat
+    # [page id, count, positions..., page id, ...] list, so the browser
+    # only loads the shards for the terms it is looking up.
+    def __init__(self, path, pages=None):
+        self.path = path
+        self.pages = pages if pages is not None else {}
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return cls(path)
+        if data.get("version") != SEARCH_FORMAT:
+            return cls(path)
+        return cls(path, data.get("pages", {}))
+
+    def save(self):
+        write_json(
+            self.path,
+            {"version": SEARCH_FORMAT, "pages": self.pages},
+            separators=(",", ":"),
+        )
+
+    def add(self, url, title, terms):
+        self.pages[url] = {"title": title, "terms": terms}
+
+    def discard(self, url):
+        self.pages.pop(url, None)
+
+    def retain(self, urls):
+        for url in set(self.pages) - set(urls):
+            del self.pages[url]
+
+    def shards(self):
+        shards = {}
+        for page_id, url in enumerate(sorted(self.pages)):
+            for term, positions in self.pages[url]["terms"].items():
+                postings = shards.setdefault(shard_name(term), {})
+                postings.setdefault(term, []).extend(
+                    [page_id, len(positions), *positions]
+                )
+        return shards
+
+    def write(self, dest_dir, basepath="/"):
+        # returns the paths under dest_dir whose contents changed
+        search_dir = os.path.join(dest_dir, "search")
+        os.makedirs(search_dir, exist_ok=True)
+        shards = self.shards()
+        prefix = basepath.rstrip("/")
+        files = {
+            "index.json": {
+                "version": SEARCH_FORMAT,
+                "pages": [
+                    [prefix + url, self.pages[url]["title"]]
+                    for url in sorted(self.pages)
+                ],
+                "shards": sorted(shards),
+            }
+        }
+        for name, postings in shards.items():
+            files[f"{name}.json"] = postings
+        changed = []
+        for name, data in files.items():
+            path = os.path.join(search_dir, name)
+            text = json.dumps(data, separators=(",", ":"), sort_keys=True)
+            if write_text_if_changed(path, text):
+                changed.append(path)
+        for name in os.listdir(search_dir):
+            if name not in files:
+                path = os.path.join(search_dir, name)
+                remove_file(path, dest_dir)
+                changed.append(path)
+        return changed
@@ -0,0 +1,1028 @@
+from concurrent.futures import ProcessPoolExecutor
+import io
+import os
+from pathlib import Path
+import shutil
+from assets import AssetPipeline, urls_digest
+from atomic import atomic_write
+from block_cache import DEFAULT_MAX_BYTES, BlockCache, markdown_to_cached_page
+from compress import (
+    CompressionIndex,
+    compress_file,
+    precompress_tree,
+    remove_compressed,
+)
+from depgraph import DependencyGraph, node_references, page_url, resolve_references
+from frontmatter import MetadataCache, page_selector, parse_front_matter
+from images import DEFAULT_WIDTHS, ImagePipeline, annotate_images
+from linkcheck import find_broken_references
+from manifest import BuildManifest
+from markdown_blocks import markdown_to_page
+from page_index import (
+    build_page_index,
+    listing_dest,
+    listing_node,
+    listing_sections,
+    listing_title,
+    rss_feed,
+    sitemap_xml,
+    summarize,
+)
+from pipeline import run_pipeline
+from profiler import NULL_PROFILER, Profiler
+from search_index import SearchIndex, node_text, tokenize
+from snapshot import SnapshotStore, node_to_tuple
+from static_sync import (
+    remove_file,
+    sync_directory,
+    sync_file,
+    write_text_if_changed,
+)
+from template import Template, rebase_node
+from watch import is_within
+
+
+def clean_output(public_dir):
+    try:
+        shutil.rmtree(public_dir)
+    except FileNotFoundError:
+        pass
+
+
+def parse_page(lines, basepath, cache=None, assets=None, images=None):
+    # Returns the page's content node and a dict with its front matter,
+    # title, text, the text of its first paragraph, the link and image URLs
+    # as written in the markdown and the node tuple of every block, all
+    # before rebasing and fingerprinting. images only tells the block cache
+    # which blocks annotate_images needs as nodes.
+    meta, lines = parse_front_matter(lines)
+    if cache is None:
+        node, title = markdown_to_page(lines)
+        info = node_references(node)
+        info["title"] = title
+        info["text"] = node_text(node)
+        paragraphs = (child for child in node.children if child.tag == "p")
+        first = next(paragraphs, None)
+        info["summary"] = node_text(first) if first is not None else None
+        info["blocks"] = [node_to_tuple(child) for child in node.children]
+        node = rebase_node(node, basepath, assets)
+    else:
+        node, info = markdown_to_cached_page(lines, cache, basepath, assets, images)
+    info["meta"] = meta
+    return node, info
+
+
+def reload_page(snapshots, from_path, basepath, assets=None):
+    # the page as parsed by an earlier build, or None if its source changed
+    if snapshots is None:
+        return None
+    page = snapshots.load(from_path)
+    if page is None:
+        return None
+    node, info = page
+    return rebase_node(node, basepath, assets), info
+
+
+def save_snapshot(snapshots, from_path, stat, info):
+    blocks = info.pop("blocks")
+    if snapshots is not None:
+        snapshots.save(from_path, stat, info, blocks)
+
+
+def generate_page(
+    from_path,
+    dest_path,
+    template,
+    basepath,
+    cache=None,
+    profiler=NULL_PROFILER,
+    write_if_changed=False,
+    images=None,
+    assets=None,
+    snapshots=None,
+):
+    with profiler.stage("parse"):
+        page = reload_page(snapshots, from_path, basepath, assets)
+        if page is None:
+            stat = os.stat(from_path)
+            with open(from_path) as f:
+                page = parse_page(f, basepath, cache, assets, images)
+            save_snapshot(snapshots, from_path, stat, page[1])
+        node, info = page
+        if images:
+            annotate_images(node, images)
+
+    variables = {"Title": info["title"], "Content": node}
+    with profiler.stage("render"):
+        if write_if_changed:
+            info["changed"] = write_text_if_changed(
+                dest_path, template.render(variables)
+            )
+            return info
+        with atomic_write(dest_path) as f:
+            template.write(f, variables)
+    info["changed"] = True
+    return info
+
+
+def page_options(images=None, assets=None, minify=False):
+    # the build settings that change a page's HTML, recorded in the manifest
+    # so that changing them re-renders the page
+    options = {}
+    if images is not None:
+        options["images"] = True
+    if assets:
+        options["assets"] = urls_digest(assets)
+    if minify:
+        options["minify"] = True
+    return options
+
+
+def page_record(page, source_path, content_dir, static_dir):
+    # manifest fields for a rendered page: the resolved files it depends on,
+    # the URLs as written, which the link checker resolves later, and the
+    # title and summary the page index is built from
+    record = resolve_references(page, source_path, content_dir, static_dir)
+    record["references"] = {"links": page["links"], "images": page["images"]}
+    record["title"] = page["title"]
+    summary = page["meta"].get("summary", page["summary"])
+    if summary is not None:
+        record["summary"] = summarize(str(summary))
+    if page["meta"]:
+        record["meta"] = page["meta"]
+    return record
+
+
+def collect_pages(src, dest):
+    pages = []
+    dirs = []
+    for name in sorted(os.listdir(src)):
+        fullname = os.path.join(src, name)
+        dest_name = os.path.join(dest, name)
+        if os.path.isfile(fullname):
+            pages.append((fullname, dest_name.replace(".md", ".html")))
+        else:
+            dirs.append(dest_name)
+            sub_pages, sub_dirs = collect_pages(fullname, dest_name)
+            pages.extend(sub_pages)
+            dirs.extend(sub_dirs)
+    return pages, dirs
+
+
+_worker_state = {}
+
+
+def _init_worker(
+    template,
+    basepath,
+    cache,
+    profile,
+    io_threads,
+    write_if_changed,
+    search,
+    images,
+    assets,
+    compress,
+    snapshots,
+):
+    _worker_state["template"] = template
+    _worker_state["basepath"] = basepath
+    _worker_state["cache"] = cache
+    _worker_state["profile"] = profile
+    _worker_state["io_threads"] = io_threads
+    _worker_state["write_if_changed"] = write_if_changed
+    _worker_state["search"] = search
+    _worker_state["images"] = images
+    _worker_state["assets"] = assets
+    _worker_state["compress"] = compress
+    _worker_state["snapshots"] = snapshots
+
+
+def page_result(job, page=None, error=None, profiler=NULL_PROFILER):
+    from_path, dest_path = job
+    result = {"source": from_path, "dest": dest_path, "page": page, "error": None}
+    if error is not None:
+        result["error"] = f"{from_path}: {error}"
+    if page is not None:
+        # tokenize here, so the text never has to be sent back to the
+        # parent process
+        text = page.pop("text")
+        if _worker_state["search"]:
+            page["terms"] = tokenize(text)
+    result["timings"] = None
+    if profiler.enabled:
+        result["timings"] = (profiler.elapsed(), profiler.stages)
+    return result
+
+
+def render_page_job(job):
+    from_path, dest_path = job
+    profiler = Profiler() if _worker_state["profile"] else NULL_PROFILER
+    try:
+        page = generate_page(
+            from_path,
+            dest_path,
+            _worker_state["template"],
+            _worker_state["basepath"],
+            _worker_state["cache"],
+            profiler,
+            _worker_state["write_if_changed"],
+            _worker_state["images"],
+            _worker_state["assets"],
+            _worker_state["snapshots"],
+        )
+        if _worker_state["compress"] and page["changed"]:
+            with profiler.stage("compress"):
+                page["compressed"] = compress_file(dest_path)
+    except Exception as e:
+        return page_result(job, error=e)
+    return page_result(job, page, profiler=profiler)
+
+
+def read_page_source(job):
+    # a fresh snapshot stands in for the source, as it needs no parsing
+    profiler = Profiler() if _worker_state["profile"] else NULL_PROFILER
+    with profiler.stage("read"):
+        page = reload_page(
+            _worker_state["snapshots"],
+            job[0],
+            _worker_state["basepath"],
+            _worker_state["assets"],
+        )
+        if page is not None:
+            return None, None, page, profiler
+        stat = os.stat(job[0])
+        return Path(job[0]).read_text(), stat, None, profiler
+
+
+def render_page_source(job, source):
+    markdown, stat, page, profiler = source
+    with profiler.stage("parse"):
+        if page is None:
+            page = parse_page(
+                markdown.split("\n"),
+                _worker_state["basepath"],
+                _worker_state["cache"],
+                _worker_state["assets"],
+                _worker_state["images"],
+            )
+            save_snapshot(_worker_state["snapshots"], job[0], stat, page[1])
+        node, info = page
+        if _worker_state["images"]:
+            annotate_images(node, _worker_state["images"])
+    with profiler.stage("render"):
+        out = io.StringIO()
+        variables = {"Title": info["title"], "Content": node}
+        _worker_state["template"].write(out, variables)
+    return out.getvalue(), info, profiler
+
+
+def write_page_output(job, output):
+    html, info, profiler = output
+    with profiler.stage("write"):
+        if _worker_state["write_if_changed"]:
+            info["changed"] = write_text_if_changed(job[1], html)
+        else:
+            with atomic_write(job[1]) as f:
+                f.write(html)
+            info["changed"] = True
+    if _worker_state["compress"] and info["changed"]:
+        with profiler.stage("compress"):
+            info["compressed"] = compress_file(job[1])
+    return info, profiler
+
+
+def render_page_chunk(jobs):
+    io_threads = _worker_state["io_threads"]
+    if io_threads <= 0:
+        return [render_page_job(job) for job in jobs]
+    results = []
+    for job, written, error in run_pipeline(
+        jobs,
+        read_page_source,
+        render_page_source,
+        write_page_output,
+        prefetch=2 * io_threads,
+        writers=io_threads,
+    ):
+        if error is not None:
+            results.append(page_result(job, error=error))
+        else:
+            page, profiler = written
+            results.append(page_result(job, page, profiler=profiler))
+    return results
+
+
+def render_pages(
+    jobs,
+    template,
+    basepath,
+    workers=1,
+    cache=None,
+    profile=False,
+    io_threads=0,
+    write_if_changed=False,
+    search=False,
+    images=None,
+    assets=None,
+    compress=False,
+    snapshots=None,
+):
+    initargs = (
+        template,
+        basepath,
+        cache,
+        profile,
+        io_threads,
+        write_if_changed,
+        search,
+        images,
+        assets,
+        compress,
+        snapshots,
+    )
+    if workers <= 1 or len(jobs) <= 1:
+        _init_worker(*initargs)
+        return render_page_chunk(jobs)
+    chunksize = max(1, len(jobs) // (workers * 4))
+    chunks = [jobs[i : i + chunksize] for i in range(0, len(jobs), chunksize)]
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=initargs
+    ) as executor:
+        results = []
+        for chunk_results in executor.map(render_page_chunk, chunks):
+            results.extend(chunk_results)
+        return results
+
+
+def generate_pages(
+    src,
+    dest,
+    template_path,
+    basepath,
+    manifest=None,
+    workers=1,
+    cache=None,
+    profiler=NULL_PROFILER,
+    io_threads=0,
+    write_if_changed=False,
+    static_dir=None,
+    search_index=None,
+    select=None,
+    images=None,
+    stale_assets=(),
+    assets=None,
+    minify=False,
+    compress=False,
+    snapshots=None,
+):
+    # images maps image URLs to the attributes added to their <img> tags;
+    # stale_assets are files whose change invalidates the pages using them;
+    # assets maps asset URLs to their fingerprinted URLs; compress writes the
+    # compressed siblings of each page as soon as it is rendered; snapshots
+    # lets pages whose source is unchanged skip parsing
+    with profiler.stage("collect_pages"):
+        pages, dirs = collect_pages(src, dest)
+        for dir_path in dirs:
+            os.makedirs(dir_path, exist_ok=True)
+
+    stats = {
+        "rendered": 0,
+        "skipped": 0,
+        "excluded": 0,
+        "errors": [],
+        "changed": [],
+        "compressed": {},
+    }
+    jobs = []
+    page_inputs = {}
+    options = page_options(images, assets, minify)
+    with profiler.stage("check_manifest"):
+        stale = set()
+        if manifest is not None and stale_assets:
+            graph = DependencyGraph(manifest.outputs)
+            stale = graph.affected_outputs(stale_assets, ["assets"])
+        for from_path, dest_path in pages:
+            if select is not None and not select(from_path):
+                # never marked as seen, so prune() removes an earlier output
+                stats["excluded"] += 1
+                continue
+            if manifest is not None:
+                inputs = manifest.page_inputs(
+                    from_path, template_path, basepath, options
+                )
+                fresh = manifest.is_fresh(dest_path, inputs)
+                if fresh and os.path.abspath(dest_path) in stale:
+                    fresh = False
+                if fresh and search_index is not None:
+                    fresh = page_url(src, from_path) in search_index.pages
+                if fresh:
+                    stats["skipped"] += 1
+                    continue
+                page_inputs[dest_path] = inputs
+            jobs.append((from_path, dest_path))
+
+    with profiler.stage("compile_template"):
+        template = Template.from_file(template_path, basepath, assets, minify)
+    with profiler.stage("render_pages"):
+        results = render_pages(
+            jobs,
+            template,
+            basepath,
+            workers,
+            cache,
+            profiler.enabled,
+            io_threads,
+            write_if_changed,
+            search_index is not None,
+            images,
+            assets,
+            compress,
+            snapshots,
+        )
+    for result in results:
+        dest_path = result["dest"]
+        if result["timings"] is not None:
+            profiler.add_page(os.path.relpath(dest_path, dest), *result["timings"])
+        if result["error"] is not None:
+            stats["errors"].append(result["error"])
+            continue
+        page = result["page"]
+        if manifest is not None:
+            inputs = page_inputs[dest_path]
+            if static_dir is not None:
+                inputs.update(
+                    page_record(page, result["source"], src, static_dir)
+                )
+            manifest.record(dest_path, inputs)
+        if search_index is not None:
+            url = page_url(src, result["source"])
+            search_index.add(url, page["title"], page["terms"])
+        stats["rendered"] += 1
+        if page["changed"]:
+            stats["changed"].append(dest_path)
+            if "compressed" in page:
+                siblings, signature = page["compressed"]
+                stats["changed"].extend(siblings)
+                stats["compressed"][dest_path] = signature
+    return stats
+
+
+def apply_changes(
+    changed_paths,
+    content_dir,
+    static_dir,
+    docs_dir,
+    template,
+    template_path,
+    basepath,
+    manifest=None,
+    cache=None,
+    search_index=None,
+    select=None,
+    images=None,
+    assets=None,
+    minify=False,
+    snapshots=None,
+    sync_compare="mtime",
+    hardlink=False,
+    write_if_changed=False,
+    profiler=NULL_PROFILER,
+):
+    # Returns the counts, the errors, and the outputs written and deleted.
+    stats = {
+        "rendered": 0,
+        "copied": 0,
+        "removed": 0,
+        "errors": [],
+        "written": [],
+        "deleted": [],
+    }
+    if manifest is not None:
+        manifest.invalidate(changed_paths)
+    static_files = set(manifest.static) if manifest is not None else set()
+    for path in sorted(changed_paths):
+        if is_within(path, static_dir):
+            relpath = os.path.relpath(path, static_dir)
+            dest_path = os.path.join(docs_dir, relpath)
+            if os.path.isfile(path):
+                if sync_file(path, dest_path, sync_compare, hardlink):
+                    stats["copied"] += 1
+                    stats["written"].append(dest_path)
+                static_files.add(relpath)
+            else:
+                if remove_file(dest_path, docs_dir):
+                    stats["removed"] += 1
+                    stats["deleted"].append(dest_path)
+                static_files.discard(relpath)
+            continue
+        if not is_within(path, content_dir):
+            continue
+        dest_path = os.path.join(docs_dir, os.path.relpath(path, content_dir))
+        dest_path = dest_path.replace(".md", ".html")
+        if not os.path.isfile(path) or (select is not None and not select(path)):
+            if manifest is not None:
+                manifest.discard(dest_path)
+            if search_index is not None:
+                search_index.discard(page_url(content_dir, path))
+            if remove_file(dest_path, docs_dir):
+                stats["removed"] += 1
+                stats["deleted"].append(dest_path)
+            continue
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        page_profiler = Profiler() if profiler.enabled else NULL_PROFILER
+        try:
+            page = generate_page(
+                path,
+                dest_path,
+                template,
+                basepath,
+                cache,
+                page_profiler,
+                write_if_changed,
+                images=images,
+                assets=assets,
+                snapshots=snapshots,
+            )
+        except Exception as e:
+            stats["errors"].append(f"{path}: {e}")
+            continue
+        if profiler.enabled:
+            profiler.add_page(
+                os.path.relpath(dest_path, docs_dir),
+                page_profiler.elapsed(),
+                page_profiler.stages,
+            )
+        text = page.pop("text")
+        if search_index is not None:
+            search_index.add(page_url(content_dir, path), page["title"], tokenize(text))
+        if manifest is not None:
+            options = page_options(images, assets, minify)
+            inputs = manifest.page_inputs(path, template_path, basepath, options)
+            inputs.update(page_record(page, path, content_dir, static_dir))
+            manifest.record(dest_path, inputs)
+        stats["rendered"] += 1
+        if page["changed"]:
+            stats["written"].append(dest_path)
+    if manifest is not None:
+        manifest.static = sorted(static_files)
+    return stats
+
+
+def expand_changes(changed_paths, manifest):
+    # Adds the source of every page whose output depends on one of the
+    # changed files, so apply_changes rebuilds them as well.
+    changed_paths = {os.path.abspath(path) for path in changed_paths}
+    graph = DependencyGraph(manifest.outputs)
+    for dest_path in graph.affected_outputs(changed_paths):
+        changed_paths.add(manifest.outputs[dest_path]["source"]["path"])
+    return changed_paths
+
+
+def write_search_index(search_index, manifest, content_dir, docs_dir, basepath):
+    # drop pages that are no longer built, then write the index to docs/
+    # and return the paths that changed
+    search_index.retain(
+        page_url(content_dir, inputs["source"]["path"])
+        for inputs in manifest.outputs.values()
+    )
+    changed = search_index.write(docs_dir, basepath)
+    search_index.save()
+    return changed
+
+
+def write_index_pages(
+    manifest,
+    content_dir,
+    docs_dir,
+    template,
+    basepath,
+    site_url=None,
+    feed_section="/blog/",
+    listings=False,
+):
+    # Writes the listing pages, sitemap and feed from the page index, removes
+    # the ones no longer generated and returns the paths that changed.
+    pages = build_page_index(manifest.outputs, content_dir)
+    feed_pages = [
+        page
+        for page in pages
+        if page["url"].startswith(feed_section) and page["url"] != feed_section
+    ]
+    home = [page["title"] for page in pages if page["url"] == "/"]
+    files = {}
+    if listings:
+        for url, section_pages in listing_sections(pages).items():
+            title = listing_title(url)
+            node = rebase_node(listing_node(section_pages), basepath)
+            relpath = os.path.relpath(listing_dest(docs_dir, url), docs_dir)
+            files[relpath] = template.render({"Title": title, "Content": node})
+            mtime = max(page["mtime"] for page in section_pages)
+            pages.append({"url": url, "title": title, "mtime": mtime})
+        pages.sort(key=lambda page: page["url"])
+    if site_url:
+        files["sitemap.xml"] = sitemap_xml(pages, site_url, basepath)
+        files["feed.xml"] = rss_feed(
+            feed_pages, site_url, basepath, home[0] if home else ""
+        )
+    changed = []
+    for relpath, text in files.items():
+        path = os.path.join(docs_dir, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if write_text_if_changed(path, text):
+            changed.append(path)
+    for relpath in manifest.generated:
+        path = os.path.join(docs_dir, relpath)
+        if relpath in files or os.path.abspath(path) in manifest.outputs:
+            # still generated, or a page from content/ has taken its place
+            continue
+        if remove_file(path, docs_dir):
+            changed.append(path)
+    manifest.generated = sorted(files)
+    return changed
+
+
+class SiteBuilder:
+    # The build engine behind the CLI. It holds the manifest, caches and
+    # compiled template between builds, so a long-running process such as a
+    # watcher, test harness or build daemon pays for them only once.
+    # Creating one has no side effects until a build method is called.
+    def __init__(
+        self,
+        content_dir,
+        static_dir,
+        template_path,
+        output_dir,
+        basepath="/",
+        cache_dir=None,
+        clean=False,
+        workers=1,
+        io_threads=0,
+        block_cache=True,
+        cache_size=DEFAULT_MAX_BYTES,
+        write_if_changed=False,
+        sync_compare="mtime",
+        hardlink=False,
+        search_index=False,
+        site_url=None,
+        feed_section="/blog/",
+        listings=False,
+        drafts=False,
+        exclude_tags=(),
+        images=False,
+        image_widths=DEFAULT_WIDTHS,
+        webp=False,
+        fingerprint=False,
+        minify=False,
+        precompress=False,
+        snapshots=False,
+        profiler=NULL_PROFILER,
+    ):
+        self.content_dir = os.path.abspath(content_dir)
+        self.static_dir = os.path.abspath(static_dir)
+        self.template_path = os.path.abspath(template_path)
+        self.output_dir = os.path.abspath(output_dir)
+        self.basepath = basepath
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(self.content_dir), ".build-cache")
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.workers = workers or os.cpu_count() or 1
+        self.io_threads = io_threads
+        self.write_if_changed = write_if_changed
+        self.sync_compare = sync_compare
+        self.hardlink = hardlink
+        self.site_url = site_url
+        self.feed_section = feed_section
+        self.listings = listings
+        self.minify = minify
+        self.precompress = precompress
+        self.compress_index_path = os.path.join(self.cache_dir, "compressed.json")
+        self.profiler = profiler
+
+        manifest_path = os.path.join(self.cache_dir, "manifest.json")
+        search_path = os.path.join(self.cache_dir, "search.json")
+        if clean:
+            self.manifest = BuildManifest(manifest_path)
+        else:
+            self.manifest = BuildManifest.load(manifest_path)
+        self.cache = None
+        if block_cache:
+            self.cache = BlockCache(os.path.join(self.cache_dir, "blocks"), cache_size)
+        self.search_index = None
+        if search_index and clean:
+            self.search_index = SearchIndex(search_path)
+        elif search_index:
+            self.search_index = SearchIndex.load(search_path)
+        self.metadata = MetadataCache.load(
+            os.path.join(self.cache_dir, "metadata.json")
+        )
+        self.select = page_selector(self.metadata, drafts, exclude_tags)
+        self.image_pipeline = None
+        if images:
+            self.image_pipeline = ImagePipeline(
+                self.static_dir,
+                self.output_dir,
+                os.path.join(self.cache_dir, "images"),
+                image_widths,
+                webp,
+            )
+        self.snapshots = None
+        if snapshots:
+            self.snapshots = SnapshotStore(os.path.join(self.cache_dir, "ast"))
+        self.image_attrs = None
+        self.asset_pipeline = None
+        if fingerprint or minify:
+            self.asset_pipeline = AssetPipeline(
+                self.static_dir, self.output_dir, self.cache_dir, fingerprint, minify
+            )
+        self.asset_urls = None
+        self.asset_files = []
+        self._template = None
+
+    @property
+    def template(self):
+        if self._template is None:
+            self._template = Template.from_file(
+                self.template_path, self.basepath, self.asset_urls, self.minify
+            )
+        return self._template
+
+    def dest_path(self, source_path):
+        relpath = os.path.relpath(os.path.abspath(source_path), self.content_dir)
+        return os.path.join(self.output_dir, relpath).replace(".md", ".html")
+
+    def build(self):
+        # Full incremental build: syncs static/, renders every page that is
+        # not up to date, removes stale outputs and refreshes the files built
+        # from the whole site. Returns the static sync and page stats, the
+        # removed outputs and the output_dir-relative paths that changed.
+        profiler = self.profiler
+        self.manifest.start_build()
+        self._template = None
+        if not self.manifest.outputs and not self.write_if_changed:
+            # without a manifest stale outputs can't be told apart from current
+            # ones; write_if_changed keeps them so unchanged files keep mtimes
+            clean_output(self.output_dir)
+        asset_stats = {"outputs": [], "written": []}
+        if self.asset_pipeline is not None:
+            with profiler.stage("assets"):
+                asset_stats = self.process_assets()
+        with profiler.stage("sync_static"):
+            # the asset stage owns its outputs; sync_directory only removes
+            # them once they are no longer written
+            outputs = set(asset_stats["outputs"])
+            sync_stats = sync_directory(
+                self.static_dir,
+                self.output_dir,
+                [relpath for relpath in self.manifest.static if relpath not in outputs],
+                self.sync_compare,
+                self.hardlink,
+                self.asset_files,
+            )
+        self.manifest.static = sorted(sync_stats["files"] + asset_stats["outputs"])
+        image_stats = {"changed": [], "written": []}
+        if self.image_pipeline is not None:
+            with profiler.stage("images"):
+                image_stats = self.process_images()
+        stats = generate_pages(
+            self.content_dir,
+            self.output_dir,
+            self.template_path,
+            self.basepath,
+            self.manifest,
+            self.workers,
+            self.cache,
+            profiler,
+            self.io_threads,
+            self.write_if_changed,
+            self.static_dir,
+            self.search_index,
+            self.select,
+            self.image_attrs,
+            image_stats["changed"],
+            self.asset_urls,
+            self.minify,
+            self.precompress,
+            self.snapshots,
+        )
+        with profiler.stage("prune_outputs"):
+            removed = self.manifest.prune()
+            if self.snapshots is not None:
+                self.snapshots.prune(
+                    inputs["source"]["path"]
+                    for inputs in self.manifest.outputs.values()
+                )
+        with profiler.stage("site_indexes"):
+            indexes_changed = self.finish()
+        with profiler.stage("precompress"):
+            compressed = self.compress_outputs(stats["compressed"])
+        if self.cache is not None:
+            with profiler.stage("prune_cache"):
+                self.cache.prune()
+        changed = (
+            set(sync_stats["changed"])
+            | set(sync_stats["deleted"])
+            | set(asset_stats["written"])
+            | {
+                os.path.relpath(path, self.output_dir)
+                for path in stats["changed"]
+                + removed
+                + indexes_changed
+                + image_stats["written"]
+                + compressed
+            }
+        )
+        return {
+            "static": sync_stats,
+            "pages": stats,
+            "removed": removed,
+            "changed": sorted(changed),
+        }
+
+    def build_page(self, source_path):
+        # Renders one page whether or not it is up to date and records it in
+        # the manifest. Site-wide files such as the search index, sitemap and
+        # listings are left alone; rebuild() refreshes those.
+        source_path = os.path.abspath(source_path)
+        dest_path = self.dest_path(source_path)
+        if self.image_pipeline is not None and self.image_attrs is None:
+            self.process_images()
+        if self.asset_pipeline is not None and self.asset_urls is None:
+            self.process_assets()
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        page = generate_page(
+            source_path,
+            dest_path,
+            self.template,
+            self.basepath,
+            self.cache,
+            write_if_changed=self.write_if_changed,
+            images=self.image_attrs,
+            assets=self.asset_urls,
+            snapshots=self.snapshots,
+        )
+        if self.precompress:
+            _, signature = compress_file(dest_path)
+            index = CompressionIndex.load(self.compress_index_path)
+            index.record(os.path.relpath(dest_path, self.output_dir), signature)
+            index.save()
+        text = page.pop("text")
+        self.manifest.invalidate([source_path, self.template_path])
+        if self.search_index is not None:
+            url = page_url(self.content_dir, source_path)
+            self.search_index.add(url, page["title"], tokenize(text))
+        options = page_options(self.image_attrs, self.asset_urls, self.minify)
+        inputs = self.manifest.page_inputs(
+            source_path, self.template_path, self.basepath, options
+        )
+        inputs.update(
+            page_record(page, source_path, self.content_dir, self.static_dir)
+        )
+        self.manifest.record(dest_path, inputs)
+        self.manifest.save()
+        return dest_path
+
+    def rebuild(self, changed_paths):
+        # Rebuilds what depends on the changed files, according to the
+        # dependency graph recorded by earlier builds, then refreshes the
+        # site-wide files. Returns the apply_changes stats, with the
+        # output_dir-relative paths that changed under "changed".
+        profiler = self.profiler
+        changed_paths = {os.path.abspath(path) for path in changed_paths}
+        static_changed = any(is_within(path, self.static_dir) for path in changed_paths)
+        changed = []
+        if self.image_pipeline is not None and (
+            static_changed or self.image_attrs is None
+        ):
+            with profiler.stage("images"):
+                changed += self.process_images()["written"]
+        if self.asset_pipeline is not None and (
+            static_changed or self.asset_urls is None
+        ):
+            with profiler.stage("assets"):
+                previous_urls = self.asset_pipeline.urls()
+                previous_outputs = self.asset_pipeline.outputs()
+                result = self.process_assets()
+            outputs = set(result["outputs"])
+            changed += [
+                os.path.join(self.output_dir, relpath) for relpath in result["written"]
+            ]
+            for relpath in previous_outputs - outputs:
+                path = os.path.join(self.output_dir, relpath)
+                if remove_file(path, self.output_dir):
+                    changed.append(path)
+            self.manifest.static = sorted(
+                (set(self.manifest.static) - previous_outputs) | outputs
+            )
+            # the asset stage has already written what these turned into
+            changed_paths -= {
+                os.path.join(self.static_dir, relpath) for relpath in self.asset_files
+            }
+            if result["urls"] != previous_urls:
+                # the template links the assets, so every page changes
+                changed_paths.add(self.template_path)
+        if self.template_path in changed_paths:
+            self._template = None
+        stats = apply_changes(
+            expand_changes(changed_paths, self.manifest),
+            self.content_dir,
+            self.static_dir,
+            self.output_dir,
+            self.template,
+            self.template_path,
+            self.basepath,
+            self.manifest,
+            self.cache,
+            self.search_index,
+            self.select,
+            self.image_attrs,
+            self.asset_urls,
+            self.minify,
+            self.snapshots,
+            self.sync_compare,
+            self.hardlink,
+            self.write_if_changed,
+            profiler,
+        )
+        with profiler.stage("site_indexes"):
+            changed += self.finish()
+        with profiler.stage("precompress"):
+            changed += self.compress_outputs(force=stats["written"])
+        changed += stats["written"] + stats["deleted"]
+        stats["changed"] = sorted(
+            {os.path.relpath(path, self.output_dir) for path in changed}
+        )
+        return stats
+
+    def process_assets(self):
+        result = self.asset_pipeline.run()
+        self.asset_urls = result["urls"]
+        self.asset_files = result["files"]
+        return result
+
+    def process_images(self):
+        result = self.image_pipeline.run(self.basepath, self.workers)
+        self.image_attrs = result["images"]
+        return result
+
+    def compress_outputs(self, compressed=None, force=()):
+        # Brings the compressed siblings in the output in line with the
+        # files next to them. compressed maps the pages generate_pages has
+        # already compressed to the signature of what it compressed, so
+        # those are only checked; force lists outputs rewritten since the
+        # last call, which are compressed again whatever the index says.
+        # Once a build runs without precompress, the siblings left from
+        # earlier builds are removed, as a server would otherwise keep
+        # sending their stale content. Returns the paths written or removed.
+        if self.precompress:
+            index = CompressionIndex.load(self.compress_index_path)
+            for path, signature in (compressed or {}).items():
+                index.record(os.path.relpath(path, self.output_dir), signature)
+            result = precompress_tree(
+                self.output_dir, index, self.workers, self.manifest.static, force
+            )
+            index.save()
+            return result["written"] + result["removed"]
+        if not os.path.exists(self.compress_index_path):
+            return []
+        removed = remove_compressed(self.output_dir, self.manifest.static)
+        os.remove(self.compress_index_path)
+        return removed
+
+    def finish(self):
+        # Writes everything built from the whole site and saves the manifest
+        # and the caches kept beside it; returns the paths that changed.
+        changed = []
+        if self.search_index is not None:
+            changed += write_search_index(
+                self.search_index,
+                self.manifest,
+                self.content_dir,
+                self.output_dir,
+                self.basepath,
+            )
+        changed += write_index_pages(
+            self.manifest,
+            self.content_dir,
+            self.output_dir,
+            self.template,
+            self.basepath,
+            self.site_url,
+            self.feed_section,
+            self.listings,
+        )
+        self.metadata.prune()
+        self.metadata.save()
+        self.manifest.save()
+        return changed
+
+    def broken_references(self):
+        # listing pages stand in for the index.md their directory lacks
+        listings = [
+            os.path.join(self.content_dir, os.path.dirname(relpath), "index.md")
+            for relpath in self.manifest.generated
+            if os.path.basename(relpath) == "index.html"
+        ]
+        return find_broken_references(
+            self.manifest.outputs, self.content_dir, self.static_dir, listings
+        )
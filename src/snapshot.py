@@ -0,0 +1,131 @@
+from difflib import SequenceMatcher
+import hashlib
+import marshal
+import os
+
+from atomic import atomic_write
+from htmlnode import LeafNode, ParentNode
+from markdown_blocks import PARSER_VERSION
+
+# bump whenever the layout of a snapshot or of a node tuple changes
+SNAPSHOT_FORMAT = 1
+
+
+def node_to_tuple(node):
+    # (tag, value, props, children), with props as (name, value) pairs and
+    # children None for leaf nodes; tuples all the way down, so blocks can
+    # be hashed and compared
+    props = tuple(node.props.items()) if node.props is not None else None
+    children = None
+    if node.children is not None:
+        children = tuple(node_to_tuple(child) for child in node.children)
+    return (node.tag, node.value, props, children)
+
+
+def tuple_to_node(data):
+    tag, value, props, children = data
+    props = dict(props) if props is not None else None
+    if children is None:
+        return LeafNode(tag, value, props)
+    return ParentNode(tag, [tuple_to_node(child) for child in children], props)
+
+
+def freeze(data):
+    # node tuples read back from JSON come as lists
+    if isinstance(data, (list, tuple)):
+        return tuple(freeze(item) for item in data)
+    return data
+
+
+def diff_blocks(old, new):
+    # difflib opcodes for every run of blocks that differs between two
+    # versions of a page: (tag, old_start, old_end, new_start, new_end)
+    matcher = SequenceMatcher(None, old, new, autojunk=False)
+    return [opcode for opcode in matcher.get_opcodes() if opcode[0] != "equal"]
+
+
+def changed_blocks(old, new):
+    # indexes of the blocks in new that were added or changed
+    return [
+        index
+        for _, _, _, start, end in diff_blocks(old, new)
+        for index in range(start, end)
+    ]
+
+
+class SnapshotStore:
+    # The parsed tree of every page, before rebasing, kept between builds
+    # together with the rest of what parsing found. A page whose source is
+    # unchanged can then be rendered again, e.g. after a template change, or
+    # inspected by other tools without running the markdown parser. Each
+    # page is one marshal file named after its source path, so render
+    # processes can write theirs concurrently.
+    def __init__(self, path):
+        self.path = path
+
+    def snapshot_path(self, source_path):
+        key = os.path.abspath(source_path).encode()
+        return os.path.join(self.path, hashlib.sha256(key).hexdigest()[:32] + ".ast")
+
+    def save(self, source_path, stat, info, blocks):
+        # stat is taken before the source is read, so an edit made while it
+        # was being parsed leaves a snapshot that load() treats as stale
+        data = marshal.dumps(
+            (
+                SNAPSHOT_FORMAT,
+                PARSER_VERSION,
+                stat.st_mtime_ns,
+                stat.st_size,
+                info,
+                freeze(blocks),
+            )
+        )
+        path = self.snapshot_path(source_path)
+        os.makedirs(self.path, exist_ok=True)
+        with atomic_write(path, "wb") as f:
+            f.write(data)
+
+    def read(self, source_path):
+        # (mtime_ns, size, info, blocks) from the snapshot, or None
+        try:
+            with open(self.snapshot_path(source_path), "rb") as f:
+                data = marshal.load(f)
+        except (FileNotFoundError, EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(data, tuple) or data[:2] != (SNAPSHOT_FORMAT, PARSER_VERSION):
+            return None
+        return data[2:]
+
+    def load(self, source_path):
+        # the page's content node and info, or None if the source changed
+        # since the snapshot was taken
+        snapshot = self.read(source_path)
+        if snapshot is None:
+            return None
+        mtime_ns, size, info, blocks = snapshot
+        stat = os.stat(source_path)
+        if (mtime_ns, size) != (stat.st_mtime_ns, stat.st_size):
+            return None
+        return ParentNode("div", [tuple_to_node(block) for block in blocks]), info
+
+    def blocks(self, source_path):
+        # the blocks of the last snapshot, whether or not it is current
+        snapshot = self.read(source_path)
+        return snapshot[3] if snapshot is not None else ()
+
+    def diff(self, source_path, blocks):
+        return diff_blocks(self.blocks(source_path), freeze(blocks))
+
+    def prune(self, source_paths):
+        # removes the snapshots of pages that are no longer built
+        keep = {os.path.basename(self.snapshot_path(path)) for path in source_paths}
+        removed = 0
+        try:
+            names = os.listdir(self.path)
+        except FileNotFoundError:
+            return 0
+        for name in names:
+            if name not in keep:
+                os.remove(os.path.join(self.path, name))
+                removed += 1
+        return removed
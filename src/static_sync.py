@@ -0,0 +1,100 @@
+import os
+import shutil
+
+from atomic import atomic_write, temporary_path
+from manifest import file_digest
+
+
+def is_up_to_date(src, dest, compare="mtime"):
+    try:
+        dest_stat = os.stat(dest)
+    except FileNotFoundError:
+        return False
+    src_stat = os.stat(src)
+    if src_stat.st_size != dest_stat.st_size:
+        return False
+    if compare == "hash":
+        return file_digest(src) == file_digest(dest)
+    return src_stat.st_mtime_ns == dest_stat.st_mtime_ns
+
+
+def sync_file(src, dest, compare="mtime", hardlink=False):
+    if is_up_to_date(src, dest, compare):
+        return False
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    with temporary_path(dest) as tmp_path:
+        if hardlink:
+            try:
+                os.link(src, tmp_path)
+            except OSError:
+                # different filesystem or no hardlink support, fall back to
+                # a copy
+                hardlink = False
+        if not hardlink:
+            # copy2 keeps the source mtime, so the next run can skip the
+            # file; on Linux shutil copies the bytes with os.sendfile
+            shutil.copy2(src, tmp_path)
+    return True
+
+
+def write_text_if_changed(path, text):
+    # leaving identical files alone keeps their mtime, so rsync and CDN sync
+    # only see outputs whose bytes actually changed
+    try:
+        with open(path, newline="") as f:
+            if f.read() == text:
+                return False
+    except FileNotFoundError:
+        pass
+    with atomic_write(path, newline="") as f:
+        f.write(text)
+    return True
+
+
+def remove_file(path, root):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return False
+    parent = os.path.dirname(path)
+    while parent != root and os.path.commonpath([parent, root]) == root:
+        try:
+            os.rmdir(parent)
+        except OSError:
+            break
+        parent = os.path.dirname(parent)
+    return True
+
+
+def sync_directory(
+    src, dest, previous=(), compare="mtime", hardlink=False, exclude=()
+):
+    # exclude holds src-relative paths another stage writes to dest
+    stats = {
+        "copied": 0,
+        "skipped": 0,
+        "removed": 0,
+        "files": [],
+        "changed": [],
+        "deleted": [],
+    }
+    exclude = set(exclude)
+    for dirpath, dirnames, filenames in os.walk(src):
+        dirnames.sort()
+        for name in sorted(filenames):
+            src_path = os.path.join(dirpath, name)
+            relpath = os.path.relpath(src_path, src)
+            if relpath in exclude:
+                continue
+            if sync_file(src_path, os.path.join(dest, relpath), compare, hardlink):
+                stats["copied"] += 1
+                stats["changed"].append(relpath)
+            else:
+                stats["skipped"] += 1
+            stats["files"].append(relpath)
+    current = set(stats["files"])
+    for relpath in sorted(previous):
+        if relpath not in current and remove_file(os.path.join(dest, relpath), dest):
+            stats["removed"] += 1
+            stats["deleted"].append(relpath)
+    return stats
@@ -0,0 +1,95 @@
+from pathlib import Path
+import re
+
+from assets import minify_html
+
+PLACEHOLDER_RE = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+ROOT_URL_RE = re.compile(r'(href|src)="/')
+URL_ATTR_RE = re.compile(r'(href|src)="([^"]*)"')
+
+
+def rebase_text(text, basepath, assets=None):
+    # assets maps root-relative asset URLs to their fingerprinted URLs
+    if assets:
+        return URL_ATTR_RE.sub(
+            lambda m: f'{m.group(1)}="{rebase_url(m.group(2), basepath, assets)}"',
+            text,
+        )
+    if basepath == "/":
+        return text
+    return ROOT_URL_RE.sub(lambda m: f'{m.group(1)}="{basepath}', text)
+
+
+def rebase_url(url, basepath, assets=None):
+    if assets:
+        url = assets.get(url, url)
+    if basepath == "/" or not url.startswith("/"):
+        return url
+    return basepath + url[1:]
+
+
+def rebase_node(node, basepath, assets=None):
+    if basepath == "/" and not assets:
+        return node
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current.props:
+            for name in ("href", "src"):
+                if name in current.props:
+                    current.props[name] = rebase_url(
+                        current.props[name], basepath, assets
+                    )
+        if current.children:
+            stack.extend(current.children)
+    return node
+
+
+class Template:
+    def __init__(self, source, basepath="/", assets=None, minify=False):
+        # minifying the literal parts once is enough: rendered nodes carry no
+        # whitespace between tags of their own
+        if minify:
+            source = minify_html(source)
+        self.parts = []
+        self.slots = []
+        pos = 0
+        for match in PLACEHOLDER_RE.finditer(source):
+            text = source[pos : match.start()]
+            self.parts.append(rebase_text(text, basepath, assets))
+            self.slots.append((len(self.parts), match.group(1)))
+            self.parts.append("")
+            pos = match.end()
+        self.parts.append(rebase_text(source[pos:], basepath, assets))
+
+    @classmethod
+    def from_file(cls, path, basepath="/", assets=None, minify=False):
+        return cls(Path(path).read_text(), basepath, assets, minify)
+
+    @property
+    def names(self):
+        return {name for _, name in self.slots}
+
+    def render(self, variables):
+        parts = self.parts.copy()
+        for index, name in self.slots:
+            value = self._lookup(variables, name)
+            parts[index] = value if isinstance(value, str) else value.to_html()
+        return "".join(parts)
+
+    def write(self, out, variables):
+        slots = dict(self.slots)
+        for index, part in enumerate(self.parts):
+            if index not in slots:
+                out.write(part)
+                continue
+            value = self._lookup(variables, slots[index])
+            if isinstance(value, str):
+                out.write(value)
+            else:
+                value.write_html(out)
+
+    def _lookup(self, variables, name):
+        if name not in variables:
+            raise ValueError(f"missing template variable: {name}")
+        return variables[name]
@@ -0,0 +1,131 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import assets
+from assets import (
+    AssetPipeline,
+    css_url_target,
+    fingerprinted_path,
+    minify_css,
+    minify_html,
+    rewrite_css_urls,
+)
+
+
+class TestMinify(unittest.TestCase):
+    def test_minify_css(self):
+        css = '/* site */\nbody {\n  margin: 0;\n  font-family: "A  B", serif;\n}\n'
+        self.assertEqual(minify_css(css), 'body{margin:0;font-family:"A  B",serif}')
+
+    def test_minify_css_keeps_descendant_pseudo_selectors(self):
+        self.assertEqual(minify_css("a :hover { color: red }"), "a :hover{color:red}")
+
+    def test_minify_html(self):
+        html = "<html>\n  <!-- note -->\n  <body>\n    <p>a  b</p>\n  </body>\n</html>"
+        self.assertEqual(minify_html(html), "<html><body><p>a b</p></body></html>")
+
+    def test_minify_html_keeps_preformatted_text(self):
+        html = "<div>\n  <pre>a\n  b</pre>\n</div>"
+        self.assertEqual(minify_html(html), "<div><pre>a\n  b</pre></div>")
+
+
+class TestCssUrls(unittest.TestCase):
+    def test_fingerprinted_path(self):
+        self.assertEqual(
+            fingerprinted_path(os.path.join("css", "a.css"), "0123456789abcdef"),
+            os.path.join("css", "a.0123456789.css"),
+        )
+
+    def test_css_url_target(self):
+        css = os.path.join("css", "site.css")
+        self.assertEqual(css_url_target(css, "../fonts/a.woff2"), "/fonts/a.woff2")
+        self.assertEqual(css_url_target(css, "b.png?v=1"), "/css/b.png")
+        self.assertEqual(css_url_target(css, "/c.ttf"), "/c.ttf")
+        self.assertIsNone(css_url_target(css, "data:image/png;base64,AA"))
+        self.assertIsNone(css_url_target(css, "https://example.com/a.woff"))
+
+    def test_rewrite_keeps_relative_urls_relative(self):
+        text, deps = rewrite_css_urls(
+            'src: url("../fonts/a.woff2?#iefix"), url(b.png);',
+            os.path.join("css", "site.css"),
+            {"/fonts/a.woff2": "/fonts/a.0123456789.woff2"},
+        )
+        self.assertEqual(
+            text, 'src: url("../fonts/a.0123456789.woff2?#iefix"), url(b.png);'
+        )
+        self.assertEqual(
+            deps,
+            {"/fonts/a.woff2": "/fonts/a.0123456789.woff2", "/css/b.png": None},
+        )
+
+
+class TestAssetPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.static = os.path.join(self.tmp.name, "static")
+        self.out = os.path.join(self.tmp.name, "docs")
+        self.cache = os.path.join(self.tmp.name, "cache")
+        self.write(
+            os.path.join(self.static, "index.css"),
+            "@font-face { src: url(fonts/a.woff2) }\nbody { margin: 0 }\n",
+        )
+        self.write(os.path.join(self.static, "fonts", "a.woff2"), "font")
+        self.write(os.path.join(self.static, "images", "a.png"), "png")
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, relpath):
+        with open(os.path.join(self.out, relpath)) as f:
+            return f.read()
+
+    def pipeline(self, fingerprint=True, minify=False):
+        return AssetPipeline(self.static, self.out, self.cache, fingerprint, minify)
+
+    def test_fingerprints_fonts_before_stylesheets(self):
+        result = self.pipeline(minify=True).run()
+        font = result["urls"]["/fonts/a.woff2"]
+        self.assertRegex(font, r"^/fonts/a\.[0-9a-f]{10}\.woff2$")
+        css = result["urls"]["/index.css"]
+        self.assertEqual(
+            self.read(css[1:]),
+            f"@font-face{{src:url(fonts/{os.path.basename(font)})}}body{{margin:0}}",
+        )
+        self.assertEqual(
+            result["files"], [os.path.join("fonts", "a.woff2"), "index.css"]
+        )
+        self.assertEqual(sorted(result["written"]), result["outputs"])
+
+    def test_unchanged_assets_are_not_hashed_again(self):
+        first = self.pipeline().run()
+        with mock.patch.object(assets, "file_digest") as digest:
+            second = self.pipeline().run()
+        digest.assert_not_called()
+        self.assertEqual(second["urls"], first["urls"])
+        self.assertEqual(second["written"], [])
+
+    def test_changed_font_changes_the_stylesheet(self):
+        first = self.pipeline().run()
+        self.write(os.path.join(self.static, "fonts", "a.woff2"), "new font")
+        second = self.pipeline().run()
+        self.assertNotEqual(second["urls"]["/index.css"], first["urls"]["/index.css"])
+        font = os.path.basename(second["urls"]["/fonts/a.woff2"])
+        self.assertIn(font, self.read(second["urls"]["/index.css"][1:]))
+
+    def test_minify_only_keeps_names(self):
+        result = self.pipeline(fingerprint=False, minify=True).run()
+        self.assertEqual(result["urls"], {})
+        self.assertEqual(result["outputs"], ["index.css"])
+        self.assertEqual(
+            self.read("index.css"),
+            "@font-face{src:url(fonts/a.woff2)}body{margin:0}",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
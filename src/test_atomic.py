@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+
+from atomic import atomic_write, temporary_path, write_json
+
+
+class TestAtomic(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "out.txt")
+        with open(self.path, "w") as f:
+            f.write("old")
+
+    def test_atomic_write(self):
+        with atomic_write(self.path) as f:
+            f.write("new")
+            with open(self.path) as current:
+                self.assertEqual(current.read(), "old")
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "new")
+        with atomic_write(self.path, "wb") as f:
+            f.write(b"\x00bytes")
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), b"\x00bytes")
+
+    def test_failure_keeps_the_previous_file(self):
+        with self.assertRaises(ValueError):
+            with atomic_write(self.path) as f:
+                f.write("partial")
+                raise ValueError("failed")
+        with self.assertRaises(OSError):
+            with temporary_path(self.path) as tmp_path:
+                os.link(os.path.join(self.tmp.name, "missing"), tmp_path)
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "old")
+        self.assertEqual(os.listdir(self.tmp.name), ["out.txt"])
+
+    def test_write_json(self):
+        path = os.path.join(self.tmp.name, "cache", "state.json")
+        write_json(path, {"b": 1, "a": [2]}, sort_keys=True)
+        with open(path) as f:
+            self.assertEqual(f.read(), '{"a": [2], "b": 1}')
+
+
+if __name__ == "__main__":
+    unittest.main()
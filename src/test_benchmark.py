@@ -0,0 +1,39 @@
+import os
+import random
+import tempfile
+import unittest
+
+from benchmark import compare, generate_corpus, parse_block_mix, synthetic_page
+from markdown_blocks import BlockType, extract_title, markdown_to_html_node
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_synthetic_page_parses(self):
+        rng = random.Random(1)
+        for _ in range(20):
+            markdown = synthetic_page(rng, blocks=10, inline_density=0.5, images=2)
+            markdown_to_html_node(markdown).to_html()
+            extract_title(markdown)
+
+    def test_generate_corpus(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = generate_corpus(tmp, pages=5, depth=3, seed=2)
+            self.assertEqual(len(paths), 5)
+            for path in paths:
+                self.assertTrue(os.path.isfile(path))
+                self.assertLessEqual(len(os.path.relpath(path, tmp).split(os.sep)), 5)
+
+    def test_parse_block_mix(self):
+        self.assertEqual(
+            parse_block_mix("paragraph=3, code=1"),
+            {BlockType.PARAGRAPH: 3, BlockType.CODE: 1},
+        )
+
+    def test_compare(self):
+        baseline = {"results": {"a": {"median": 1.0}, "b": {"median": 1.0}}}
+        current = {"results": {"a": {"median": 1.05}, "b": {"median": 1.5}}}
+        self.assertEqual(compare(baseline, current, 0.1), [("b", 1.0, 1.5)])
+
+
+if __name__ == "__main__":
+    unittest.main()
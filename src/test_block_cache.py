@@ -0,0 +1,68 @@
+import os
+import tempfile
+import time
+import unittest
+
+from block_cache import BlockCache, markdown_to_cached_page
+from markdown_blocks import markdown_to_page
+from snapshot import freeze, node_to_tuple
+from template import rebase_node
+
+
+class TestBlockCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = BlockCache(os.path.join(self.tmp.name, "blocks"))
+
+    def test_get_missing(self):
+        self.assertIsNone(self.cache.get(self.cache.key(["text"], "/")))
+
+    def test_put_and_get(self):
+        key = self.cache.key(["text"], "/")
+        entry = {"html": "<p>text</p>", "links": [], "images": []}
+        self.cache.put(key, entry)
+        self.assertEqual(self.cache.get(key), entry)
+
+    def test_key_depends_on_basepath(self):
+        self.assertNotEqual(
+            self.cache.key(["[a](/b)"], "/"), self.cache.key(["[a](/b)"], "/site/")
+        )
+
+    def test_cached_page_matches_uncached(self):
+        md = "# Title\n\n[home](/) and ![img](/a.png)\n\n- one\n- **two**"
+        node, title = markdown_to_page(md.split("\n"))
+        blocks = tuple(node_to_tuple(child) for child in node.children)
+        expected = rebase_node(node, "/site/").to_html()
+        for _ in range(2):
+            node, info = markdown_to_cached_page(md.split("\n"), self.cache, "/site/")
+            self.assertEqual(node.to_html(), expected)
+            self.assertEqual(info["title"], title)
+            self.assertEqual(info["links"], ["/"])
+            self.assertEqual(info["images"], ["/a.png"])
+            self.assertEqual(freeze(info["blocks"]), blocks)
+
+    def test_assets_are_fingerprinted_after_the_lookup(self):
+        md = ["# Title", "", "[style](/a.css) and [home](/)"]
+        for fingerprinted in ("/a.0123456789.css", "/a.abcdef0123.css"):
+            assets = {"/a.css": fingerprinted}
+            node, _ = markdown_to_cached_page(md, self.cache, "/site/", assets)
+            self.assertIn(f'href="/site{fingerprinted}"', node.to_html())
+            self.assertIn('href="/site/"', node.to_html())
+
+    def test_prune_evicts_least_recently_used(self):
+        keys = [self.cache.key([str(i)], "/") for i in range(3)]
+        for i, key in enumerate(keys):
+            self.cache.put(key, "x" * 8)
+            past = time.time() - 100 + i
+            os.utime(self.cache.entry_path(key), (past, past))
+        self.cache.get(keys[0])
+        self.cache.max_bytes = 20
+        self.assertEqual(self.cache.prune(), 1)
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNotNone(self.cache.get(keys[2]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import gzip
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import compress
+from compress import (
+    CompressionIndex,
+    compress_file,
+    precompress_tree,
+    remove_compressed,
+)
+
+
+class TestCompress(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = os.path.join(self.tmp.name, "docs")
+        self.page = os.path.join(self.root, "blog", "index.html")
+        self.write(self.page, "<p>hello</p>" * 20)
+        self.write(os.path.join(self.root, "index.css"), "body{margin:0}")
+        self.write(os.path.join(self.root, "images", "a.png"), "png")
+        self.index_path = os.path.join(self.tmp.name, "cache", "compressed.json")
+        self.index = CompressionIndex.load(self.index_path)
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read_gzip(self, path):
+        with gzip.open(path, "rt") as f:
+            return f.read()
+
+    def test_compress_file(self):
+        with mock.patch.object(compress, "brotli", None):
+            siblings, signature = compress_file(self.page)
+        self.assertEqual(siblings, [self.page + ".gz"])
+        self.assertEqual(self.read_gzip(self.page + ".gz"), "<p>hello</p>" * 20)
+        stat = os.stat(self.page)
+        self.assertEqual(signature, [stat.st_mtime_ns, stat.st_size])
+
+    def test_gzip_output_is_deterministic(self):
+        data = b"<p>same</p>"
+        self.assertEqual(compress.gzip_bytes(data), compress.gzip_bytes(data))
+
+    def test_precompress_tree(self):
+        with mock.patch.object(compress, "brotli", None):
+            result = precompress_tree(self.root, self.index, workers=2)
+            self.assertEqual(
+                sorted(result["written"]),
+                [self.page + ".gz", os.path.join(self.root, "index.css.gz")],
+            )
+            png = os.path.join(self.root, "images", "a.png")
+            self.assertFalse(os.path.exists(png + ".gz"))
+            self.index.save()
+            index = CompressionIndex.load(self.index_path)
+            self.assertEqual(precompress_tree(self.root, index)["written"], [])
+            self.assertEqual(
+                precompress_tree(self.root, index, force=[self.page])["written"],
+                [self.page + ".gz"],
+            )
+
+    def test_changed_size_with_the_same_mtime_is_stale(self):
+        with mock.patch.object(compress, "brotli", None):
+            precompress_tree(self.root, self.index)
+            mtime_ns = os.stat(self.page).st_mtime_ns
+            self.write(self.page, "<p>changed</p>")
+            os.utime(self.page, ns=(mtime_ns, mtime_ns))
+            result = precompress_tree(self.root, self.index)
+        self.assertEqual(result["written"], [self.page + ".gz"])
+        self.assertEqual(self.read_gzip(self.page + ".gz"), "<p>changed</p>")
+
+    def test_missing_sibling_is_written_again(self):
+        with mock.patch.object(compress, "brotli", None):
+            precompress_tree(self.root, self.index)
+            os.remove(self.page + ".gz")
+            result = precompress_tree(self.root, self.index)
+        self.assertEqual(result["written"], [self.page + ".gz"])
+
+    def test_orphaned_and_stale_siblings_are_removed(self):
+        self.write(os.path.join(self.root, "old.html.gz"), "stale")
+        self.write(self.page + ".br", "stale")
+        self.write(os.path.join(self.root, "data.json.gz"), "from static")
+        with mock.patch.object(compress, "brotli", None):
+            result = precompress_tree(self.root, self.index, keep=["data.json.gz"])
+        self.assertEqual(
+            sorted(result["removed"]),
+            [self.page + ".br", os.path.join(self.root, "old.html.gz")],
+        )
+        self.assertTrue(os.path.exists(os.path.join(self.root, "data.json.gz")))
+
+    def test_remove_compressed(self):
+        precompress_tree(self.root, self.index)
+        self.write(os.path.join(self.root, "data.json.gz"), "from static")
+        remove_compressed(self.root, keep=["data.json.gz"])
+        names = [name for _, _, names in os.walk(self.root) for name in names]
+        self.assertEqual(
+            sorted(names), ["a.png", "data.json.gz", "index.css", "index.html"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+
+from depgraph import (
+    DependencyGraph,
+    node_references,
+    page_url,
+    resolve_references,
+    site_path,
+)
+from markdown_blocks import markdown_to_html_node
+
+
+class TestDepgraph(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.content = os.path.join(self.tmp.name, "content")
+        self.static = os.path.join(self.tmp.name, "static")
+        for path in (
+            os.path.join(self.content, "index.md"),
+            os.path.join(self.content, "blog", "post", "index.md"),
+            os.path.join(self.content, "contact.md"),
+            os.path.join(self.static, "files", "cv.pdf"),
+        ):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write("# Title")
+
+    def test_node_references(self):
+        node = markdown_to_html_node(
+            "# [Home](/)\n\n![a](/a.png) [b](b.html)\n\n- ![c](c.png)"
+        )
+        self.assertEqual(
+            node_references(node),
+            {"links": ["/", "b.html"], "images": ["/a.png", "c.png"]},
+        )
+
+    def test_page_url(self):
+        index = os.path.join(self.content, "index.md")
+        self.assertEqual(page_url(self.content, index), "/")
+        self.assertEqual(
+            page_url(self.content, os.path.join(self.content, "blog", "index.md")),
+            "/blog/",
+        )
+        self.assertEqual(
+            page_url(self.content, os.path.join(self.content, "contact.md")),
+            "/contact.html",
+        )
+
+    def test_site_path(self):
+        self.assertEqual(site_path("/images/a.png", "/blog/"), "/images/a.png")
+        self.assertEqual(site_path("a.png", "/blog/post/"), "/blog/post/a.png")
+        self.assertEqual(site_path("../", "/blog/post/"), "/blog/")
+        self.assertEqual(site_path("/contact#form", "/"), "/contact")
+        self.assertIsNone(site_path("https://example.com/", "/"))
+        self.assertIsNone(site_path("mailto:me@example.com", "/"))
+        self.assertIsNone(site_path("#top", "/"))
+
+    def test_resolve_references(self):
+        source = os.path.join(self.content, "blog", "post", "index.md")
+        references = {
+            "links": ["/", "../../contact.html", "/files/cv.pdf", "/missing"],
+            "images": ["cover.png", "https://example.com/a.png"],
+        }
+        self.assertEqual(
+            resolve_references(references, source, self.content, self.static),
+            {
+                "assets": [
+                    os.path.join(self.static, "blog", "post", "cover.png"),
+                    os.path.join(self.static, "files", "cv.pdf"),
+                ],
+                "links": [
+                    os.path.join(self.content, "contact.md"),
+                    os.path.join(self.content, "index.md"),
+                    os.path.join(self.content, "missing", "index.md"),
+                ],
+            },
+        )
+
+    def test_dependents(self):
+        def inputs(source, assets=(), links=()):
+            return {
+                "source": {"path": source},
+                "template": {"path": "/site/template.html"},
+                "assets": list(assets),
+                "links": list(links),
+            }
+
+        graph = DependencyGraph(
+            {
+                "/out/index.html": inputs("/c/index.md", ["/s/a.png"]),
+                "/out/b.html": inputs("/c/b.md", links=["/c/index.md"]),
+            }
+        )
+        self.assertEqual(graph.dependents("/s/a.png"), {"/out/index.html"})
+        self.assertEqual(graph.dependents("/c/index.md"), {"/out/index.html"})
+        self.assertEqual(
+            graph.dependents("/c/index.md", ["links"]), {"/out/b.html"}
+        )
+        self.assertEqual(
+            graph.affected_outputs(["/site/template.html"]),
+            {"/out/index.html", "/out/b.html"},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
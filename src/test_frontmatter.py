@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+
+from frontmatter import (
+    MetadataCache,
+    page_selector,
+    page_tags,
+    parse_front_matter,
+    parse_value,
+    read_front_matter,
+)
+
+
+class TestFrontMatter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = MetadataCache(os.path.join(self.tmp.name, "metadata.json"))
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_parse_value(self):
+        self.assertIs(parse_value(" true"), True)
+        self.assertEqual(parse_value("[a, 'b c', ]"), ["a", "b c"])
+        self.assertEqual(parse_value('"x: y"'), "x: y")
+        self.assertEqual(parse_value("2024-05-01"), "2024-05-01")
+
+    def test_parse_front_matter(self):
+        lines = ["---", "title: Hi", "draft: false", "---", "# Page", ""]
+        meta, rest = parse_front_matter(lines)
+        self.assertEqual(meta, {"title": "Hi", "draft": False})
+        self.assertEqual(list(rest), ["# Page", ""])
+
+    def test_without_front_matter(self):
+        meta, rest = parse_front_matter(["# Page", "text"])
+        self.assertEqual(meta, {})
+        self.assertEqual(list(rest), ["# Page", "text"])
+
+    def test_invalid_front_matter(self):
+        with self.assertRaises(ValueError):
+            parse_front_matter(["---", "title: x"])
+        with self.assertRaises(ValueError):
+            parse_front_matter(["---", "no colon", "---"])
+
+    def test_read_stops_at_the_fence(self):
+        path = self.write("page.md", "---\ntags: [a]\n---\n\xff not read")
+        self.assertEqual(read_front_matter(path), {"tags": ["a"]})
+
+    def test_cache_reuses_unchanged_files(self):
+        path = self.write("page.md", "---\ndraft: true\n---\n# Page")
+        self.assertEqual(self.cache.get(path), {"draft": True})
+        self.cache.save()
+        cache = MetadataCache.load(self.cache.path)
+        cache.entries[path]["meta"] = {"cached": True}
+        self.assertEqual(cache.get(path), {"cached": True})
+        os.remove(path)
+        cache.prune()
+        self.assertEqual(cache.entries, {})
+
+    def test_page_selector(self):
+        draft = self.write("draft.md", "---\ndraft: true\n---\n# Draft")
+        tagged = self.write("tagged.md", "---\ntags: [private, x]\n---\n# Tagged")
+        plain = self.write("plain.md", "# Plain")
+        select = page_selector(self.cache, exclude_tags=["private"])
+        self.assertEqual(
+            [select(path) for path in (draft, tagged, plain)], [False, False, True]
+        )
+        select = page_selector(self.cache, drafts=True)
+        self.assertEqual(
+            [select(path) for path in (draft, tagged, plain)], [True, True, True]
+        )
+
+    def test_scalar_tags(self):
+        flagged = self.write("flagged.md", "---\ntags: true\n---\n# Flagged")
+        single = self.write("single.md", "---\ntags: private\n---\n# Single")
+        select = page_selector(self.cache, exclude_tags=["private"])
+        self.assertEqual([select(flagged), select(single)], [True, False])
+        select = page_selector(self.cache, exclude_tags=["true"])
+        self.assertFalse(select(flagged))
+        self.assertEqual(page_tags({"tags": [1, False]}), ["1", "false"])
+
+
+if __name__ == "__main__":
+    unittest.main()
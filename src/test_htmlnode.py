@@ -1,3 +1,4 @@
+import io
 import unittest
 from htmlnode import LeafNode, ParentNode, HTMLNode
 
@@ -108,6 +109,31 @@ class TestHTMLNode(unittest.TestCase):
             "<h2><b>Bold text</b>Normal text<i>italic text</i>Normal text</h2>",
         )
 
+    def test_write_html(self):
+        node = ParentNode(
+            "ul",
+            [ParentNode("li", [LeafNode("a", "link", {"href": "/x"})])],
+            {"class": "list"},
+        )
+        out = io.StringIO()
+        node.write_html(out)
+        self.assertEqual(
+            out.getvalue(),
+            '<ul class="list"><li><a href="/x">link</a></li></ul>',
+        )
+        self.assertEqual(node.to_html(), out.getvalue())
+
+    def test_to_html_no_children(self):
+        node = ParentNode("div", None)
+        with self.assertRaises(ValueError):
+            node.to_html()
+
+    def test_nodes_are_slotted(self):
+        for node in (LeafNode("b", "text"), ParentNode("p", [])):
+            self.assertFalse(hasattr(node, "__dict__"))
+            with self.assertRaises(AttributeError):
+                node.extra = True
+
 
 if __name__ == "__main__":
     unittest.main()
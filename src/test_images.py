@@ -0,0 +1,216 @@
+import os
+import struct
+import tempfile
+import unittest
+from unittest import mock
+
+from htmlnode import LeafNode, ParentNode
+from images import (
+    ImagePipeline,
+    annotate_images,
+    image_size,
+    read_png,
+    resize_png,
+    variant_path,
+    write_png,
+)
+
+
+class FakeImage:
+    # stands in for a Pillow image, saving a short description of itself
+    format = "PNG"
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def load(self):
+        pass
+
+    def resize(self, size, resample):
+        return FakeImage(*size)
+
+    def save(self, path, format):
+        with open(path, "w") as f:
+            f.write(f"{format} {self.width}x{self.height}")
+
+
+def gradient(width, height):
+    return [
+        bytearray((x * 10 + y) % 256 for x in range(width * 3)) for y in range(height)
+    ]
+
+
+class TestImages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.static = os.path.join(self.tmp.name, "static")
+        self.out = os.path.join(self.tmp.name, "docs")
+        os.makedirs(os.path.join(self.static, "images"))
+
+    def png(self, name, width, height):
+        path = os.path.join(self.static, "images", name)
+        write_png(path, width, height, 2, [], gradient(width, height))
+        return path
+
+    def test_header_sizes(self):
+        self.assertEqual(image_size(self.png("a.png", 7, 3)), (7, 3))
+        gif = os.path.join(self.tmp.name, "a.gif")
+        with open(gif, "wb") as f:
+            f.write(b"GIF89a" + struct.pack("<HH", 12, 34) + bytes(20))
+        self.assertEqual(image_size(gif), (12, 34))
+        jpeg = os.path.join(self.tmp.name, "a.jpg")
+        with open(jpeg, "wb") as f:
+            f.write(b"\xff\xd8\xff\xe0\x00\x04ab")
+            f.write(b"\xff\xc0\x00\x11\x08" + struct.pack(">HH", 40, 50) + bytes(12))
+        self.assertEqual(image_size(jpeg), (50, 40))
+
+    def test_truncated_images_have_no_size(self):
+        bad = os.path.join(self.static, "images", "bad.jpg")
+        truncated = (
+            b"\xff\xd8\xff",
+            b"\xff\xd8\xff\xe0\x00",
+            b"\xff\xd8\xff\xc0\x00\x11\x08",
+        )
+        for data in truncated:
+            with open(bad, "wb") as f:
+                f.write(data)
+            self.assertIsNone(image_size(bad))
+        cache = os.path.join(self.tmp.name, "cache")
+        result = ImagePipeline(self.static, self.out, cache).run()
+        self.assertEqual(result["images"], {})
+
+    def test_png_round_trip(self):
+        path = self.png("a.png", 5, 4)
+        self.assertEqual(read_png(path), (5, 4, 2, [], gradient(5, 4)))
+
+    def test_resize_png(self):
+        src = self.png("a.png", 8, 4)
+        dest = os.path.join(self.tmp.name, "small.png")
+        wide = os.path.join(self.tmp.name, "wide.png")
+        with mock.patch("images.read_png", wraps=read_png) as decode:
+            self.assertTrue(resize_png(src, [(dest, 4, None), (wide, 6, None)]))
+        decode.assert_called_once_with(src)
+        width, height, _, _, rows = read_png(dest)
+        self.assertEqual((width, height), (4, 2))
+        # each output pixel averages a 2x2 block
+        self.assertEqual(rows[0][0], (0 + 1 + 30 + 31) // 4)
+        self.assertEqual(read_png(wide)[:2], (6, 3))
+
+    def test_pipeline_writes_variants_once(self):
+        self.png("big.png", 40, 20)
+        self.png("small.png", 10, 10)
+        cache = os.path.join(self.tmp.name, "cache")
+        result = ImagePipeline(self.static, self.out, cache, [16, 32]).run("/site/")
+        big = "/site/images/big.png"
+        self.assertEqual(
+            result["images"][big],
+            {
+                "width": 40,
+                "height": 20,
+                "srcset": f"{variant_path(big, 16)} 16w, "
+                f"{variant_path(big, 32)} 32w, {big} 40w",
+            },
+        )
+        small = result["images"]["/site/images/small.png"]
+        self.assertEqual(small, {"width": 10, "height": 10})
+        self.assertEqual(len(result["changed"]), 2)
+        variant = os.path.join(self.out, "images", "big-16w.png")
+        self.assertEqual(image_size(variant), (16, 8))
+
+        result = ImagePipeline(self.static, self.out, cache, [16, 32]).run("/site/")
+        self.assertEqual((result["changed"], result["written"]), ([], []))
+
+        self.png("big.png", 20, 20)
+        result = ImagePipeline(self.static, self.out, cache, [16, 32]).run()
+        self.assertEqual(len(result["changed"]), 1)
+        variant = os.path.join(self.out, "images", "big-32w.png")
+        self.assertFalse(os.path.exists(variant))
+
+    def test_changed_widths_remove_old_variants(self):
+        self.png("big.png", 40, 20)
+        cache = os.path.join(self.tmp.name, "cache")
+        ImagePipeline(self.static, self.out, cache, [16, 32]).run()
+        result = ImagePipeline(self.static, self.out, cache, [16]).run()
+        self.assertEqual(len(result["changed"]), 1)
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.out, "images"))), ["big-16w.png"]
+        )
+
+    def test_variants_larger_than_the_source_are_dropped(self):
+        path = os.path.join(self.static, "images", "flat.png")
+        rows = [bytearray(30 * 3) for _ in range(30)]
+        write_png(path, 30, 30, 2, [], rows)
+        cache = os.path.join(self.tmp.name, "cache")
+        pipeline = ImagePipeline(self.static, self.out, cache, [10, 20])
+        with mock.patch.object(pipeline, "is_smaller", side_effect=[False, True]):
+            result = pipeline.run()
+        self.assertEqual(
+            result["images"]["/images/flat.png"]["srcset"],
+            "/images/flat-20w.png 20w, /images/flat.png 30w",
+        )
+        self.assertFalse(
+            os.path.exists(os.path.join(self.out, "images", "flat-10w.png"))
+        )
+
+    def test_webp_versions(self):
+        self.png("big.png", 40, 20)
+        cache = os.path.join(self.tmp.name, "cache")
+        pillow = mock.Mock(open=lambda path: FakeImage(40, 20))
+        with mock.patch.multiple(
+            "images", Image=pillow, features=mock.Mock(check=lambda name: True)
+        ):
+            pipeline = ImagePipeline(self.static, self.out, cache, [16], webp=True)
+            result = pipeline.run()
+        self.assertEqual(
+            result["images"]["/images/big.png"]["webp"],
+            "/images/big-16w.png.webp 16w, /images/big.png.webp 40w",
+        )
+        with open(os.path.join(self.out, "images", "big.png.webp")) as f:
+            self.assertEqual(f.read(), "WEBP 40x20")
+        with open(os.path.join(self.out, "images", "big-16w.png")) as f:
+            self.assertEqual(f.read(), "PNG 16x8")
+
+        node = ParentNode(
+            "p", [LeafNode("img", "", {"src": "/images/big.png", "alt": "a"})]
+        )
+        self.assertEqual(
+            annotate_images(node, result["images"]).to_html(),
+            '<p><picture><source type="image/webp" srcset="/images/big-16w.png.webp '
+            '16w, /images/big.png.webp 40w"></source><img src="/images/big.png" '
+            'alt="a" width="40" height="20" srcset="/images/big-16w.png 16w, '
+            '/images/big.png 40w"></img></picture></p>',
+        )
+
+        # without Pillow's WebP support the option does nothing
+        result = ImagePipeline(self.static, self.out, cache, [16], webp=True).run()
+        self.assertNotIn("webp", result["images"]["/images/big.png"])
+        self.assertFalse(
+            os.path.exists(os.path.join(self.out, "images", "big.png.webp"))
+        )
+
+    def test_annotate_images(self):
+        images = {"/a.png": {"width": 4, "height": 2}}
+        node = ParentNode(
+            "div",
+            [
+                LeafNode("img", "", {"src": "/a.png", "alt": "a"}),
+                LeafNode(None, '<p><img src="/a.png" alt="b"></img></p>'),
+            ],
+        )
+        self.assertEqual(
+            annotate_images(node, images).to_html(),
+            '<div><img src="/a.png" alt="a" width="4" height="2"></img>'
+            '<p><img src="/a.png" alt="b"></img></p></div>',
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
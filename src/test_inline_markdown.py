@@ -3,12 +3,13 @@ from inline_markdown import (
     split_nodes_delimiter,
     split_nodes_image,
     split_nodes_link,
+    text_to_html_nodes,
     text_to_textnodes,
     extract_markdown_links,
     extract_markdown_images,
 )
 
-from textnode import TextNode, TextType
+from textnode import TextNode, TextType, text_node_to_html_node
 
 
 class TestInlineMarkdown(unittest.TestCase):
@@ -191,6 +192,39 @@ class TestInlineMarkdown(unittest.TestCase):
             nodes,
         )
 
+    def test_text_to_textnodes_matches_chained_splits(self):
+        texts = [
+            "",
+            "plain text",
+            "**bold _not italic_** and _italic `not code`_",
+            "**`not code`** and `code`",
+            "[link_with](/under_scores) and ![img](/a.png)[next](/b)",
+            "!![a](b) and [](empty) ****",
+            "**bold [link](/x)** then [link **bold**](/y)",
+        ]
+        for text in texts:
+            nodes = [TextNode(text, TextType.TEXT)]
+            nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+            nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+            nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+            nodes = split_nodes_link(split_nodes_image(nodes))
+            self.assertListEqual(nodes, text_to_textnodes(text), text)
+
+    def test_text_to_textnodes_unclosed(self):
+        for text in ["**bold", "_a **b** c_", "`a_b`", "`a **b**`", "a `b"]:
+            with self.assertRaises(ValueError, msg=text):
+                text_to_textnodes(text)
+
+    def test_text_to_html_nodes(self):
+        text = "**b** _i_ `c` [a](/x) ![m](/y.png) plain"
+        expected = [
+            text_node_to_html_node(node).to_html()
+            for node in text_to_textnodes(text)
+        ]
+        self.assertListEqual(
+            [node.to_html() for node in text_to_html_nodes(text)], expected
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+
+from linkcheck import find_broken_references
+
+
+class TestLinkCheck(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.content = os.path.join(self.tmp.name, "content")
+        self.static = os.path.join(self.tmp.name, "static")
+        os.makedirs(os.path.join(self.static, "images"))
+        with open(os.path.join(self.static, "images", "a.png"), "w") as f:
+            f.write("png")
+
+    def output(self, relpath, links=(), images=()):
+        return {
+            "source": {"path": os.path.join(self.content, *relpath.split("/"))},
+            "references": {"links": list(links), "images": list(images)},
+        }
+
+    def test_finds_broken_references(self):
+        outputs = {
+            "/out/index.html": self.output(
+                "index.md",
+                links=["/blog/post", "/blog/missing/", "https://example.com/"],
+                images=["/images/a.png", "/images/b.png"],
+            ),
+            "/out/blog/post/index.html": self.output(
+                "blog/post/index.md",
+                links=["../../", "/images/a.png", "#top", "other.html"],
+                images=["a.png"],
+            ),
+        }
+        post = os.path.join(self.content, "blog", "post", "index.md")
+        self.assertEqual(
+            find_broken_references(outputs, self.content, self.static),
+            [
+                (post, "links", "other.html"),
+                (post, "images", "a.png"),
+                (os.path.join(self.content, "index.md"), "links", "/blog/missing/"),
+                (os.path.join(self.content, "index.md"), "images", "/images/b.png"),
+            ],
+        )
+
+    def test_entries_without_references_are_skipped(self):
+        outputs = {"/out/index.html": self.output("index.md", links=["/nope"])}
+        del outputs["/out/index.html"]["references"]
+        self.assertEqual(find_broken_references(outputs, self.content, self.static), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+
+from manifest import BuildManifest
+
+
+class TestBuildManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = self.tmp.name
+        self.source = self.write("index.md", "# Hello")
+        self.template = self.write("template.html", "{{ Content }}")
+        self.dest = self.write("index.html", "<h1>Hello</h1>")
+        self.manifest_path = os.path.join(self.dir, "cache", "manifest.json")
+
+    def write(self, name, text):
+        path = os.path.join(self.dir, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def recorded_manifest(self, basepath="/"):
+        manifest = BuildManifest(self.manifest_path)
+        inputs = manifest.page_inputs(self.source, self.template, basepath)
+        manifest.record(self.dest, inputs)
+        manifest.save()
+        return BuildManifest.load(self.manifest_path)
+
+    def test_new_output_is_stale(self):
+        manifest = BuildManifest(self.manifest_path)
+        inputs = manifest.page_inputs(self.source, self.template, "/")
+        self.assertFalse(manifest.is_fresh(self.dest, inputs))
+
+    def test_unchanged_inputs_are_fresh(self):
+        manifest = self.recorded_manifest()
+        inputs = manifest.page_inputs(self.source, self.template, "/")
+        self.assertTrue(manifest.is_fresh(self.dest, inputs))
+
+    def test_changed_source_is_stale(self):
+        manifest = self.recorded_manifest()
+        self.write("index.md", "# Hello again")
+        inputs = manifest.page_inputs(self.source, self.template, "/")
+        self.assertFalse(manifest.is_fresh(self.dest, inputs))
+
+    def test_changed_template_is_stale(self):
+        manifest = self.recorded_manifest()
+        self.write("template.html", "<main>{{ Content }}</main>")
+        inputs = manifest.page_inputs(self.source, self.template, "/")
+        self.assertFalse(manifest.is_fresh(self.dest, inputs))
+
+    def test_changed_basepath_is_stale(self):
+        manifest = self.recorded_manifest()
+        inputs = manifest.page_inputs(self.source, self.template, "/site/")
+        self.assertFalse(manifest.is_fresh(self.dest, inputs))
+
+    def test_missing_output_is_stale(self):
+        manifest = self.recorded_manifest()
+        os.remove(self.dest)
+        inputs = manifest.page_inputs(self.source, self.template, "/")
+        self.assertFalse(manifest.is_fresh(self.dest, inputs))
+
+    def test_prune_removes_unseen_outputs(self):
+        manifest = self.recorded_manifest()
+        removed = manifest.prune()
+        self.assertEqual(removed, [os.path.abspath(self.dest)])
+        self.assertFalse(os.path.exists(self.dest))
+        self.assertEqual(manifest.outputs, {})
+
+    def test_load_ignores_corrupt_manifest(self):
+        os.makedirs(os.path.dirname(self.manifest_path))
+        with open(self.manifest_path, "w") as f:
+            f.write("not json")
+        self.assertEqual(BuildManifest.load(self.manifest_path).outputs, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
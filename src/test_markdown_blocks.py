@@ -1,6 +1,8 @@
 import unittest
 from markdown_blocks import (
+    BlockReader,
     extract_title,
+    markdown_to_page,
     markdown_to_html_node,
     markdown_to_blocks,
     block_to_block_type,
@@ -186,6 +188,32 @@ This is a paragraph without a title
         with self.assertRaises(Exception):
             extract_title(md)
 
+    def test_block_reader(self):
+        lines = ["# Title\n", "\n", "  - one\n", "- two  \n", "\n", "\n", "text"]
+        reader = BlockReader(lines)
+        self.assertEqual(
+            list(reader),
+            [
+                (BlockType.HEADING, ["# Title"]),
+                (BlockType.ULIST, ["- one", "- two"]),
+                (BlockType.PARAGRAPH, ["text"]),
+            ],
+        )
+        self.assertEqual(reader.title, "Title")
+
+    def test_block_reader_skips_blank_blocks(self):
+        self.assertEqual(markdown_to_blocks("a\n\n \n\nb"), ["a", "b"])
+
+    def test_markdown_to_page(self):
+        md = "Intro\n\n# The Title\n\n> quoted"
+        node, title = markdown_to_page(md.split("\n"))
+        self.assertEqual(title, "The Title")
+        self.assertEqual(node.to_html(), markdown_to_html_node(md).to_html())
+
+    def test_markdown_to_page_no_title(self):
+        with self.assertRaises(Exception):
+            markdown_to_page(["## Not a title"])
+
 
 if __name__ == "__main__":
     unittest.main()
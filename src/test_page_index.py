@@ -0,0 +1,87 @@
+import os
+import unittest
+
+from page_index import (
+    build_page_index,
+    listing_node,
+    listing_sections,
+    rss_feed,
+    sitemap_xml,
+    summarize,
+)
+
+
+def page(url, title="T", summary=None, mtime=0):
+    return {
+        "url": url,
+        "title": title,
+        "summary": summary,
+        "mtime": mtime,
+        "published": mtime,
+    }
+
+
+class TestPageIndex(unittest.TestCase):
+    def test_summarize(self):
+        self.assertEqual(summarize("one\n two  three"), "one two three")
+        self.assertEqual(summarize("one two three", 9), "one two…")
+
+    def test_build_page_index(self):
+        content = os.path.join(os.sep, "site", "content")
+        source = os.path.join(content, "blog", "tom", "index.md")
+        outputs = {
+            "/docs/blog/tom/index.html": {
+                "source": {"path": source, "size": 12, "mtime_ns": 2_500_000_000},
+                "title": "Tom",
+                "summary": "Old Tom",
+                "meta": {"date": "1970-01-02", "tags": "hobbits"},
+            },
+            "/docs/old.html": {"source": {"path": "/site/content/old.md"}},
+        }
+        self.assertEqual(
+            build_page_index(outputs, content),
+            [
+                {
+                    "url": "/blog/tom/",
+                    "source": source,
+                    "dest": "/docs/blog/tom/index.html",
+                    "title": "Tom",
+                    "summary": "Old Tom",
+                    "size": 12,
+                    "mtime": 2.5,
+                    "published": 86400,
+                    "tags": ["hobbits"],
+                    "meta": {"date": "1970-01-02", "tags": "hobbits"},
+                }
+            ],
+        )
+
+    def test_sitemap(self):
+        sitemap = sitemap_xml([page("/", mtime=86400)], "https://x.org/", "/s/")
+        self.assertIn("<loc>https://x.org/s/</loc>", sitemap)
+        self.assertIn("<lastmod>1970-01-02</lastmod>", sitemap)
+
+    def test_feed_is_newest_first(self):
+        feed = rss_feed(
+            [page("/a/", "A & B", "x", mtime=1), page("/b/", "B", mtime=2)],
+            "https://x.org",
+            title="Site",
+        )
+        self.assertLess(feed.index("<title>B</title>"), feed.index("A &amp; B"))
+        self.assertIn("<link>https://x.org/a/</link>", feed)
+        self.assertEqual(feed.count("<description>"), 2)
+
+    def test_listing_sections(self):
+        pages = [page("/"), page("/blog/a/"), page("/blog/b/", mtime=1), page("/x/")]
+        sections = listing_sections(pages)
+        self.assertEqual(list(sections), ["/blog/"])
+        urls = [section_page["url"] for section_page in sections["/blog/"]]
+        self.assertEqual(urls, ["/blog/b/", "/blog/a/"])
+        self.assertEqual(
+            listing_node(sections["/blog/"][1:]).to_html(),
+            '<ul><li><h2><a href="/blog/a/">T</a></h2></li></ul>',
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
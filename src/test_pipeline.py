@@ -0,0 +1,67 @@
+import threading
+import unittest
+
+from pipeline import run_pipeline
+
+
+class TestPipeline(unittest.TestCase):
+    def test_results_in_order(self):
+        written = {}
+        lock = threading.Lock()
+
+        def write(job, output):
+            with lock:
+                written[job] = output
+            return output
+
+        results = run_pipeline(
+            range(50), lambda job: job * 2, lambda job, data: data + 1, write
+        )
+        self.assertEqual([job for job, _, _ in results], list(range(50)))
+        self.assertEqual(
+            [result for _, result, _ in results], [j * 2 + 1 for j in range(50)]
+        )
+        self.assertEqual(written, {j: j * 2 + 1 for j in range(50)})
+
+    def test_errors_are_reported_per_job(self):
+        def read(job):
+            if job == 1:
+                raise OSError("unreadable")
+            return job
+
+        def render(job, data):
+            if job == 2:
+                raise ValueError("bad markdown")
+            return data
+
+        def write(job, output):
+            if job == 3:
+                raise OSError("disk full")
+            return output
+
+        results = run_pipeline(range(5), read, render, write)
+        errors = [type(error) for _, _, error in results]
+        self.assertEqual(
+            errors, [type(None), OSError, ValueError, OSError, type(None)]
+        )
+
+    def test_reader_stays_bounded(self):
+        read_ahead = []
+        rendered = [0]
+
+        def read(job):
+            read_ahead.append(job - rendered[0])
+            return job
+
+        def render(job, data):
+            rendered[0] += 1
+            return data
+
+        run_pipeline(
+            range(100), read, render, lambda job, output: output, prefetch=4
+        )
+        self.assertLessEqual(max(read_ahead), 4 + 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import json
+import os
+import tempfile
+import unittest
+
+from profiler import NULL_PROFILER, Profiler
+
+
+class TestProfiler(unittest.TestCase):
+    def test_stage_counts_calls(self):
+        profiler = Profiler()
+        for _ in range(3):
+            with profiler.stage("parse"):
+                pass
+        self.assertEqual(profiler.stages["parse"]["calls"], 3)
+        self.assertGreaterEqual(profiler.stages["parse"]["seconds"], 0)
+
+    def test_stage_records_on_error(self):
+        profiler = Profiler()
+        with self.assertRaises(ValueError):
+            with profiler.stage("parse"):
+                raise ValueError("boom")
+        self.assertEqual(profiler.stages["parse"]["calls"], 1)
+
+    def test_pages_merge_into_stages(self):
+        profiler = Profiler()
+        profiler.add_page("a.html", 0.5, {"parse": {"calls": 1, "seconds": 0.4}})
+        profiler.add_page("b.html", 0.1, {"parse": {"calls": 1, "seconds": 0.05}})
+        self.assertEqual(profiler.stages["parse"]["calls"], 2)
+        self.assertEqual([path for path, _ in profiler.slowest_pages(1)], ["a.html"])
+
+    def test_write_json(self):
+        profiler = Profiler()
+        profiler.add_page("a.html", 0.5, {"parse": {"calls": 1, "seconds": 0.4}})
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "out", "profile.json")
+            profiler.write_json(path)
+            with open(path) as f:
+                report = json.load(f)
+        self.assertEqual(report["pages"]["a.html"]["seconds"], 0.5)
+        self.assertIn("parse", report["stages"])
+
+    def test_null_profiler(self):
+        with NULL_PROFILER.stage("parse"):
+            pass
+        self.assertFalse(NULL_PROFILER.enabled)
+
+
+if __name__ == "__main__":
+    unittest.main()
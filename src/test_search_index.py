@@ -0,0 +1,66 @@
+import json
+import os
+import tempfile
+import unittest
+
+from markdown_blocks import markdown_to_html_node
+from search_index import SearchIndex, node_text, tokenize
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.docs = os.path.join(self.tmp.name, "docs")
+        self.index = SearchIndex(os.path.join(self.tmp.name, "search.json"))
+
+    def read(self, name):
+        with open(os.path.join(self.docs, "search", name)) as f:
+            return json.load(f)
+
+    def test_node_text(self):
+        node = markdown_to_html_node("# Hi\n\nSome **bold** [link](/x)")
+        self.assertEqual(node_text(node).split(), ["Hi", "Some", "bold", "link"])
+
+    def test_tokenize_delta_encodes_positions(self):
+        self.assertEqual(
+            tokenize("The ring, the RING and the ring"),
+            {"the": [0, 2, 3], "ring": [1, 2, 3], "and": [4]},
+        )
+
+    def test_write_shards_terms(self):
+        self.index.add("/b/", "B", tokenize("ring elf"))
+        self.index.add("/a/", "A", tokenize("elf"))
+        self.index.write(self.docs, "/site/")
+        self.assertEqual(
+            self.read("index.json"),
+            {
+                "version": 1,
+                "pages": [["/site/a/", "A"], ["/site/b/", "B"]],
+                "shards": ["e", "r"],
+            },
+        )
+        self.assertEqual(self.read("e.json"), {"elf": [0, 1, 0, 1, 1, 1]})
+        self.assertEqual(self.read("r.json"), {"ring": [1, 1, 0]})
+
+    def test_write_removes_stale_shards_and_skips_unchanged(self):
+        self.index.add("/a/", "A", tokenize("elf ring"))
+        self.index.write(self.docs)
+        self.index.add("/a/", "A", tokenize("elf"))
+        changed = self.index.write(self.docs)
+        search_dir = os.path.join(self.docs, "search")
+        expected = [os.path.join(search_dir, name) for name in ("index.json", "r.json")]
+        self.assertEqual(sorted(changed), expected)
+        self.assertEqual(self.index.write(self.docs), [])
+
+    def test_save_and_load(self):
+        self.index.add("/a/", "A", tokenize("elf"))
+        self.index.save()
+        loaded = SearchIndex.load(self.index.path)
+        self.assertEqual(loaded.pages, self.index.pages)
+        loaded.retain(["/b/"])
+        self.assertEqual(loaded.pages, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,468 @@
+import gzip
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import site_builder
+from site_builder import (
+    SiteBuilder,
+    apply_changes,
+    collect_pages,
+    expand_changes,
+    generate_page,
+    generate_pages,
+)
+from images import write_png
+from manifest import BuildManifest
+from profiler import Profiler
+from template import Template
+
+
+class SiteFixture:
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.content = os.path.join(self.tmp.name, "content")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        self.write(self.template, "<title>{{ Title }}</title>\n{{ Content }}\n")
+        self.write(
+            os.path.join(self.content, "index.md"), "# Home\n\n[Blog](/blog)"
+        )
+        for i in range(6):
+            self.write(
+                os.path.join(self.content, "blog", f"post{i}", "index.md"),
+                f"# Post {i}\n\n![cover](/images/{i}.png) and **bold**",
+            )
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read_tree(self, root):
+        files = {}
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                with open(path, "rb") as f:
+                    files[os.path.relpath(path, root)] = f.read()
+        return files
+
+
+class TestGeneratePages(SiteFixture, unittest.TestCase):
+    def test_collect_pages_is_sorted(self):
+        pages, dirs = collect_pages(self.content, "out")
+        self.assertEqual(
+            pages[0],
+            (
+                os.path.join(self.content, "blog", "post0", "index.md"),
+                os.path.join("out", "blog", "post0", "index.html"),
+            ),
+        )
+        self.assertEqual(dirs[0], os.path.join("out", "blog"))
+        self.assertEqual(len(pages), 7)
+
+    def test_parallel_output_matches_serial(self):
+        serial = os.path.join(self.tmp.name, "serial")
+        parallel = os.path.join(self.tmp.name, "parallel")
+        generate_pages(self.content, serial, self.template, "/site/")
+        stats = generate_pages(
+            self.content, parallel, self.template, "/site/", workers=3
+        )
+        self.assertEqual(stats["rendered"], 7)
+        self.assertEqual(self.read_tree(serial), self.read_tree(parallel))
+
+    def test_pipelined_output_matches_serial(self):
+        serial = os.path.join(self.tmp.name, "serial")
+        pipelined = os.path.join(self.tmp.name, "pipelined")
+        generate_pages(self.content, serial, self.template, "/site/")
+        for workers in (1, 2):
+            stats = generate_pages(
+                self.content,
+                pipelined,
+                self.template,
+                "/site/",
+                workers=workers,
+                io_threads=2,
+            )
+            self.assertEqual(stats["rendered"], 7)
+            self.assertEqual(self.read_tree(serial), self.read_tree(pipelined))
+
+    def test_write_if_changed(self):
+        out = os.path.join(self.tmp.name, "out")
+        generate_pages(self.content, out, self.template, "/")
+        page = os.path.join(out, "index.html")
+        os.utime(page, (0, 0))
+        self.write(os.path.join(self.content, "blog", "post3", "index.md"), "# New")
+        stats = generate_pages(
+            self.content, out, self.template, "/", write_if_changed=True
+        )
+        self.assertEqual(stats["rendered"], 7)
+        self.assertEqual(
+            stats["changed"], [os.path.join(out, "blog", "post3", "index.html")]
+        )
+        self.assertEqual(os.stat(page).st_mtime, 0)
+
+    def test_failed_render_keeps_the_previous_page(self):
+        template = Template.from_file(self.template)
+        source = os.path.join(self.content, "index.md")
+        page = os.path.join(self.tmp.name, "out", "index.html")
+        os.makedirs(os.path.dirname(page))
+        generate_page(source, page, template, "/")
+        with open(page) as f:
+            before = f.read()
+
+        def write(out, variables):
+            out.write("<title>")
+            raise ValueError("render failed")
+
+        with mock.patch.object(template, "write", side_effect=write):
+            with self.assertRaises(ValueError):
+                generate_page(source, page, template, "/")
+        with open(page) as f:
+            self.assertEqual(f.read(), before)
+        self.assertEqual(os.listdir(os.path.dirname(page)), ["index.html"])
+
+    def test_errors_are_collected(self):
+        self.write(os.path.join(self.content, "broken", "index.md"), "no title")
+        self.write(os.path.join(self.content, "worse", "index.md"), "**open")
+        out = os.path.join(self.tmp.name, "out")
+        stats = generate_pages(self.content, out, self.template, "/", workers=2)
+        self.assertEqual(stats["rendered"], 7)
+        self.assertEqual(len(stats["errors"]), 2)
+
+    def test_apply_changes(self):
+        static = os.path.join(self.tmp.name, "static")
+        out = os.path.join(self.tmp.name, "out")
+        generate_pages(self.content, out, self.template, "/")
+        changed_page = os.path.join(self.content, "blog", "post1", "index.md")
+        removed_page = os.path.join(self.content, "blog", "post2", "index.md")
+        new_asset = os.path.join(static, "images", "new.png")
+        self.write(changed_page, "# Changed")
+        os.remove(removed_page)
+        self.write(new_asset, "png")
+        stats = apply_changes(
+            {changed_page, removed_page, new_asset},
+            self.content,
+            static,
+            out,
+            Template.from_file(self.template),
+            self.template,
+            "/",
+        )
+        self.assertEqual(
+            (stats["rendered"], stats["copied"], stats["removed"]), (1, 1, 1)
+        )
+        tree = self.read_tree(out)
+        self.assertIn(
+            b"<h1>Changed</h1>", tree[os.path.join("blog", "post1", "index.html")]
+        )
+        self.assertNotIn(os.path.join("blog", "post2", "index.html"), tree)
+        self.assertEqual(tree[os.path.join("images", "new.png")], b"png")
+
+    def test_front_matter_and_excluded_pages(self):
+        draft = os.path.join(self.content, "blog", "post4", "index.md")
+        self.write(draft, "---\ndraft: true\n---\n# Draft")
+        post5 = os.path.join(self.content, "blog", "post5", "index.md")
+        self.write(post5, "---\ntitle: Five\n---\n# Post 5")
+        out = os.path.join(self.tmp.name, "out")
+        stats = generate_pages(
+            self.content, out, self.template, "/", select=lambda path: path != draft
+        )
+        self.assertEqual((stats["rendered"], stats["excluded"]), (6, 1))
+        tree = self.read_tree(out)
+        self.assertNotIn(os.path.join("blog", "post4", "index.html"), tree)
+        self.assertEqual(
+            tree[os.path.join("blog", "post5", "index.html")],
+            b"<title>Post 5</title>\n<div><h1>Post 5</h1></div>\n",
+        )
+
+    def test_expand_changes_follows_dependencies(self):
+        static = os.path.join(self.tmp.name, "static")
+        out = os.path.join(self.tmp.name, "out")
+        manifest = BuildManifest(os.path.join(self.tmp.name, "manifest.json"))
+        generate_pages(
+            self.content, out, self.template, "/", manifest, static_dir=static
+        )
+        image = os.path.join(static, "images", "2.png")
+        post2 = os.path.join(self.content, "blog", "post2", "index.md")
+        self.assertEqual(expand_changes({image}, manifest), {image, post2})
+        self.assertEqual(len(expand_changes({self.template}, manifest)), 8)
+        blog = os.path.join(self.content, "blog", "index.md")
+        self.assertEqual(expand_changes({blog}, manifest), {blog})
+
+
+class TestSiteBuilder(SiteFixture, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.write(os.path.join(self.static, "images", "0.png"), "png")
+        self.out = os.path.join(self.tmp.name, "docs")
+        self.builder = SiteBuilder(
+            self.content, self.static, self.template, self.out, "/site/"
+        )
+
+    def test_build_reuses_warm_state(self):
+        result = self.builder.build()
+        self.assertEqual(result["pages"]["rendered"], 7)
+        self.assertIn(os.path.join("images", "0.png"), result["changed"])
+        self.assertTrue(
+            os.path.exists(os.path.join(self.tmp.name, ".build-cache", "manifest.json"))
+        )
+        self.write(os.path.join(self.content, "blog", "post3", "index.md"), "# New")
+        os.remove(os.path.join(self.content, "blog", "post4", "index.md"))
+        result = self.builder.build()
+        self.assertEqual(
+            (result["pages"]["rendered"], result["pages"]["skipped"]), (1, 5)
+        )
+        self.assertEqual(
+            result["changed"],
+            [
+                os.path.join("blog", "post3", "index.html"),
+                os.path.join("blog", "post4", "index.html"),
+            ],
+        )
+
+    def test_build_page(self):
+        source = os.path.join(self.content, "blog", "post1", "index.md")
+        dest = self.builder.build_page(source)
+        self.assertEqual(dest, os.path.join(self.out, "blog", "post1", "index.html"))
+        with open(dest) as f:
+            self.assertIn("<h1>Post 1</h1>", f.read())
+        self.assertIn(dest, self.builder.manifest.outputs)
+
+    def test_images_stage_rebuilds_pages_using_changed_images(self):
+        image = os.path.join(self.static, "images", "0.png")
+        write_png(image, 4, 2, 0, [], [bytearray(4)] * 2)
+        builder = SiteBuilder(
+            self.content, self.static, self.template, self.out, images=True
+        )
+        builder.build()
+        page = os.path.join(self.out, "blog", "post0", "index.html")
+        with open(page) as f:
+            self.assertIn('alt="cover" width="4" height="2"', f.read())
+        write_png(image, 6, 2, 0, [], [bytearray(6)] * 2)
+        result = builder.build()
+        self.assertEqual(result["pages"]["rendered"], 1)
+        with open(page) as f:
+            self.assertIn('alt="cover" width="6" height="2"', f.read())
+
+    def test_images_stage_leaves_code_alone(self):
+        image = os.path.join(self.static, "images", "0.png")
+        write_png(image, 4, 2, 0, [], [bytearray(4)] * 2)
+        self.write(
+            os.path.join(self.content, "index.md"),
+            '# Home\n\n![cover](/images/0.png)\n\n'
+            '```\n<img src="/images/0.png" alt="code">\n```',
+        )
+        pages = []
+        for block_cache in (True, True, False):
+            out = os.path.join(self.tmp.name, f"out-{len(pages)}")
+            builder = SiteBuilder(
+                self.content,
+                self.static,
+                self.template,
+                out,
+                block_cache=block_cache,
+                images=True,
+            )
+            builder.build()
+            with open(os.path.join(out, "index.html")) as f:
+                pages.append(f.read())
+        self.assertIn('alt="cover" width="4" height="2"', pages[0])
+        self.assertIn('<img src="/images/0.png" alt="code">\n', pages[0])
+        self.assertEqual(pages, [pages[0]] * 3)
+
+    def test_rebuild_writes_only_changed_pages(self):
+        profiler = Profiler()
+        builder = SiteBuilder(
+            self.content,
+            self.static,
+            self.template,
+            self.out,
+            write_if_changed=True,
+            profiler=profiler,
+        )
+        builder.build()
+        page = os.path.join(self.out, "index.html")
+        os.utime(page, (0, 0))
+        post = os.path.join(self.content, "blog", "post1", "index.md")
+        self.write(post, "# Changed")
+        stats = builder.rebuild([self.template, post])
+        self.assertEqual(stats["rendered"], 7)
+        self.assertEqual(
+            stats["changed"], [os.path.join("blog", "post1", "index.html")]
+        )
+        self.assertEqual(os.stat(page).st_mtime, 0)
+        self.assertIn("index.html", profiler.pages)
+
+    def test_rebuild_keeps_the_sync_settings(self):
+        builder = SiteBuilder(
+            self.content, self.static, self.template, self.out, hardlink=True
+        )
+        builder.build()
+        css = os.path.join(self.static, "index.css")
+        self.write(css, "p {}")
+        builder.rebuild([css])
+        self.assertTrue(os.path.samefile(css, os.path.join(self.out, "index.css")))
+
+    def test_content_page_replaces_a_listing(self):
+        builder = SiteBuilder(
+            self.content, self.static, self.template, self.out, listings=True
+        )
+        builder.build()
+        page = os.path.join(self.out, "blog", "index.html")
+        with open(page) as f:
+            self.assertIn("Post 0", f.read())
+        self.write(os.path.join(self.content, "blog", "index.md"), "# My blog")
+        builder.build()
+        with open(page) as f:
+            self.assertIn("<h1>My blog</h1>", f.read())
+
+    def test_rebuild_follows_the_template(self):
+        self.builder.build()
+        self.write(self.template, "<main>{{ Content }}</main>")
+        stats = self.builder.rebuild([self.template])
+        self.assertEqual(stats["rendered"], 7)
+        with open(os.path.join(self.out, "index.html")) as f:
+            self.assertTrue(f.read().startswith("<main><div><h1>Home</h1>"))
+
+    def test_fingerprinted_assets(self):
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        self.write(self.template, '<link href="/index.css" />\n{{ Content }}')
+        builder = SiteBuilder(
+            self.content,
+            self.static,
+            self.template,
+            self.out,
+            "/site/",
+            fingerprint=True,
+            minify=True,
+        )
+        builder.build()
+        css = builder.asset_urls["/index.css"]
+        self.assertFalse(os.path.exists(os.path.join(self.out, "index.css")))
+        with open(os.path.join(self.out, css[1:])) as f:
+            self.assertEqual(f.read(), "body{margin:0}")
+        with open(os.path.join(self.out, "index.html")) as f:
+            self.assertTrue(f.read().startswith(f'<link href="/site{css}" />'))
+
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 1px }")
+        stats = builder.rebuild([os.path.join(self.static, "index.css")])
+        self.assertEqual((stats["rendered"], stats["copied"]), (7, 0))
+        self.assertFalse(os.path.exists(os.path.join(self.out, css[1:])))
+        new_css = builder.asset_urls["/index.css"]
+        with open(os.path.join(self.out, "blog", "post2", "index.html")) as f:
+            self.assertIn(new_css[1:], f.read())
+
+        plain = SiteBuilder(self.content, self.static, self.template, self.out)
+        result = plain.build()
+        self.assertEqual(result["pages"]["rendered"], 7)
+        self.assertFalse(os.path.exists(os.path.join(self.out, new_css[1:])))
+        self.assertTrue(os.path.exists(os.path.join(self.out, "index.css")))
+
+    def test_fingerprinting_leaves_code_alone(self):
+        self.write(os.path.join(self.static, "x.css"), "p {}")
+        self.write(
+            os.path.join(self.content, "index.md"),
+            '# Home\n\n[style](/x.css) and `href="/x.css"`\n\n'
+            '```\n<link href="/x.css" />\n```',
+        )
+        pages = []
+        for block_cache in (True, False):
+            out = os.path.join(self.tmp.name, f"out-{block_cache}")
+            builder = SiteBuilder(
+                self.content,
+                self.static,
+                self.template,
+                out,
+                cache_dir=os.path.join(self.tmp.name, f"cache-{block_cache}"),
+                block_cache=block_cache,
+                fingerprint=True,
+            )
+            for _ in range(2):
+                builder.build()
+                with open(os.path.join(out, "index.html")) as f:
+                    pages.append(f.read())
+                builder.manifest.outputs.clear()
+        fingerprinted = builder.asset_urls["/x.css"]
+        self.assertIn(f'<a href="{fingerprinted}">style</a>', pages[0])
+        self.assertIn('<code>href="/x.css"</code>', pages[0])
+        self.assertIn('<link href="/x.css" />', pages[0])
+        self.assertEqual(pages, [pages[0]] * 4)
+
+    def test_precompressed_outputs(self):
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        builder = SiteBuilder(
+            self.content, self.static, self.template, self.out, precompress=True
+        )
+        result = builder.build()
+        page = os.path.join(self.out, "blog", "post1", "index.html")
+        for path in (page, os.path.join(self.out, "index.css")):
+            self.assertTrue(os.path.exists(path + ".gz"))
+        self.assertIn(
+            os.path.join("blog", "post1", "index.html.gz"), result["changed"]
+        )
+        self.assertFalse(
+            os.path.exists(os.path.join(self.out, "images", "0.png.gz"))
+        )
+        # pages compressed while rendering are not compressed again
+        with mock.patch("compress.compress_file") as compress_file:
+            result = builder.build()
+        compress_file.assert_not_called()
+        self.assertEqual(result["changed"], [])
+
+        self.write(os.path.join(self.content, "blog", "post1", "index.md"), "# New")
+        builder.rebuild([os.path.join(self.content, "blog", "post1", "index.md")])
+        with gzip.open(page + ".gz", "rt") as f:
+            self.assertIn("<h1>New</h1>", f.read())
+
+        plain = SiteBuilder(self.content, self.static, self.template, self.out)
+        result = plain.build()
+        self.assertFalse(os.path.exists(page + ".gz"))
+        self.assertIn("index.css.gz", result["changed"])
+
+    def test_source_edited_while_parsing_is_parsed_again(self):
+        builder = SiteBuilder(
+            self.content, self.static, self.template, self.out, snapshots=True
+        )
+        source = os.path.join(self.content, "index.md")
+        parse_page = site_builder.parse_page
+
+        def edit_while_parsing(*args):
+            page = parse_page(*args)
+            self.write(source, "# Edited while parsing")
+            os.utime(source, ns=(0, 10**18))
+            return page
+
+        with mock.patch("site_builder.parse_page", side_effect=edit_while_parsing):
+            builder.build_page(source)
+        builder.build_page(source)
+        with open(os.path.join(self.out, "index.html")) as f:
+            self.assertIn("<h1>Edited while parsing</h1>", f.read())
+
+    def test_snapshots_skip_parsing_unchanged_pages(self):
+        builder = SiteBuilder(
+            self.content, self.static, self.template, self.out, snapshots=True
+        )
+        builder.build()
+        before = self.read_tree(self.out)
+        self.write(self.template, "<title>{{ Title }}</title>\n{{ Content }}\n")
+        with mock.patch("site_builder.parse_page") as parse_page:
+            stats = builder.rebuild([self.template])
+        parse_page.assert_not_called()
+        self.assertEqual(stats["rendered"], 7)
+        self.assertEqual(self.read_tree(self.out), before)
+
+        source = os.path.join(self.content, "blog", "post2", "index.md")
+        self.write(source, "# Post 2\n\nchanged")
+        builder.rebuild([source])
+        self.assertEqual(builder.snapshots.load(source)[1]["title"], "Post 2")
+        os.remove(source)
+        builder.build()
+        self.assertEqual(len(os.listdir(builder.snapshots.path)), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import marshal
+import os
+import tempfile
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from markdown_blocks import markdown_to_page
+from snapshot import (
+    SnapshotStore,
+    changed_blocks,
+    diff_blocks,
+    freeze,
+    node_to_tuple,
+    tuple_to_node,
+)
+
+
+def page_blocks(markdown):
+    node, _ = markdown_to_page(markdown.split("\n"))
+    return [node_to_tuple(child) for child in node.children]
+
+
+class TestNodeTuples(unittest.TestCase):
+    def test_round_trip(self):
+        node = ParentNode(
+            "p",
+            [
+                LeafNode("a", "home", {"href": "/", "title": "Home"}),
+                LeafNode(None, " text"),
+                ParentNode("b", [LeafNode(None, "bold")]),
+            ],
+        )
+        data = node_to_tuple(node)
+        self.assertEqual(marshal.loads(marshal.dumps(data)), data)
+        self.assertEqual(tuple_to_node(data).to_html(), node.to_html())
+
+    def test_freeze_restores_json_lists(self):
+        data = node_to_tuple(LeafNode("img", "", {"src": "/a.png"}))
+        as_json = ["img", "", [["src", "/a.png"]], None]
+        self.assertEqual(freeze(as_json), data)
+        hash(freeze(as_json))
+
+
+class TestDiff(unittest.TestCase):
+    def test_changed_blocks(self):
+        old = page_blocks("# Title\n\none\n\ntwo\n\nthree")
+        new = page_blocks("# Title\n\none\n\nTWO\n\nthree\n\nfour")
+        self.assertEqual(changed_blocks(old, new), [2, 4])
+        self.assertEqual(
+            diff_blocks(old, new), [("replace", 2, 3, 2, 3), ("insert", 4, 4, 4, 5)]
+        )
+
+    def test_removed_blocks(self):
+        old = page_blocks("# Title\n\none\n\ntwo")
+        new = page_blocks("# Title\n\ntwo")
+        self.assertEqual(changed_blocks(old, new), [])
+        self.assertEqual(diff_blocks(old, new), [("delete", 1, 2, 1, 1)])
+
+
+class TestSnapshotStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = SnapshotStore(os.path.join(self.tmp.name, "ast"))
+        self.source = os.path.join(self.tmp.name, "index.md")
+        self.write("# Title\n\n[home](/) and **bold**")
+
+    def write(self, text):
+        self.text = text
+        with open(self.source, "w") as f:
+            f.write(text)
+
+    def save(self):
+        blocks = page_blocks(self.text)
+        stat = os.stat(self.source)
+        self.store.save(self.source, stat, {"title": "Title", "links": ["/"]}, blocks)
+        return blocks
+
+    def test_load_returns_the_saved_page(self):
+        self.assertIsNone(self.store.load(self.source))
+        blocks = self.save()
+        node, info = self.store.load(self.source)
+        self.assertEqual(info, {"title": "Title", "links": ["/"]})
+        expected, _ = markdown_to_page(self.text.split("\n"))
+        self.assertEqual(node.to_html(), expected.to_html())
+        self.assertEqual(self.store.blocks(self.source), tuple(blocks))
+
+    def test_changed_source_is_stale(self):
+        self.save()
+        self.write("# Title\n\nnew text")
+        self.assertIsNone(self.store.load(self.source))
+        new_blocks = page_blocks("# Title\n\nnew text")
+        self.assertEqual(
+            self.store.diff(self.source, new_blocks), [("replace", 1, 2, 1, 2)]
+        )
+
+    def test_unreadable_snapshot_is_ignored(self):
+        os.makedirs(self.store.path)
+        with open(self.store.snapshot_path(self.source), "wb") as f:
+            f.write(marshal.dumps((0, 0, 0, 0, {}, ())))
+        self.assertIsNone(self.store.load(self.source))
+        with open(self.store.snapshot_path(self.source), "wb") as f:
+            f.write(b"\x00garbage")
+        self.assertIsNone(self.store.load(self.source))
+
+    def test_prune(self):
+        self.save()
+        self.assertEqual(self.store.prune([self.source]), 0)
+        self.assertEqual(self.store.prune([]), 1)
+        self.assertIsNone(self.store.load(self.source))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+
+from static_sync import sync_directory, write_text_if_changed
+
+
+class TestStaticSync(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.src = os.path.join(self.tmp.name, "static")
+        self.dest = os.path.join(self.tmp.name, "docs")
+        self.write(os.path.join(self.src, "index.css"), "body {}")
+        self.write(os.path.join(self.src, "images", "a.png"), "png")
+        self.write(os.path.join(self.dest, "index.html"), "<html></html>")
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_first_sync_copies_everything(self):
+        stats = sync_directory(self.src, self.dest)
+        self.assertEqual((stats["copied"], stats["skipped"]), (2, 0))
+        self.assertEqual(
+            stats["files"], ["index.css", os.path.join("images", "a.png")]
+        )
+        self.assertEqual(
+            self.read(os.path.join(self.dest, "images", "a.png")), "png"
+        )
+
+    def test_unchanged_files_are_skipped(self):
+        sync_directory(self.src, self.dest)
+        for compare in ("mtime", "hash"):
+            stats = sync_directory(self.src, self.dest, compare=compare)
+            self.assertEqual((stats["copied"], stats["skipped"]), (0, 2))
+
+    def test_changed_file_is_copied(self):
+        sync_directory(self.src, self.dest)
+        self.write(os.path.join(self.src, "index.css"), "body { margin: 0 }")
+        stats = sync_directory(self.src, self.dest)
+        self.assertEqual((stats["copied"], stats["skipped"]), (1, 1))
+        self.assertEqual(
+            self.read(os.path.join(self.dest, "index.css")), "body { margin: 0 }"
+        )
+
+    def test_stale_files_are_removed(self):
+        previous = sync_directory(self.src, self.dest)["files"]
+        os.remove(os.path.join(self.src, "images", "a.png"))
+        stats = sync_directory(self.src, self.dest, previous)
+        self.assertEqual(stats["removed"], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.html")))
+
+    def test_excluded_files_are_left_to_another_stage(self):
+        previous = sync_directory(self.src, self.dest)["files"]
+        stats = sync_directory(self.src, self.dest, previous, exclude=["index.css"])
+        self.assertEqual(stats["files"], [os.path.join("images", "a.png")])
+        self.assertEqual(stats["deleted"], ["index.css"])
+
+    def test_changed_and_deleted_lists(self):
+        previous = sync_directory(self.src, self.dest)["files"]
+        self.write(os.path.join(self.src, "index.css"), "body { margin: 0 }")
+        os.remove(os.path.join(self.src, "images", "a.png"))
+        stats = sync_directory(self.src, self.dest, previous)
+        self.assertEqual(stats["changed"], ["index.css"])
+        self.assertEqual(stats["deleted"], [os.path.join("images", "a.png")])
+
+    def test_write_text_if_changed(self):
+        path = os.path.join(self.dest, "index.html")
+        self.assertFalse(write_text_if_changed(path, "<html></html>"))
+        self.assertTrue(write_text_if_changed(path, "<html>new</html>"))
+        self.assertEqual(self.read(path), "<html>new</html>")
+
+    def test_hardlink(self):
+        sync_directory(self.src, self.dest, hardlink=True)
+        self.assertTrue(
+            os.path.samefile(
+                os.path.join(self.src, "index.css"),
+                os.path.join(self.dest, "index.css"),
+            )
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
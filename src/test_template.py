@@ -0,0 +1,87 @@
+import io
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from template import Template, rebase_node, rebase_url
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render_replaces_only_placeholders(self):
+        template = Template("<title>{{ Title }}</title>\n<main>{{ Content }}</main>")
+        self.assertEqual(
+            template.render({"Title": "Hi", "Content": "<p>x</p>"}),
+            "<title>Hi</title>\n<main><p>x</p></main>",
+        )
+
+    def test_arbitrary_placeholders(self):
+        template = Template("{{Date}} by {{ Author }}, {{ Author }}")
+        self.assertEqual(template.names, {"Date", "Author"})
+        self.assertEqual(
+            template.render({"Date": "today", "Author": "me"}), "today by me, me"
+        )
+
+    def test_missing_variable(self):
+        template = Template("{{ Title }}")
+        with self.assertRaises(ValueError):
+            template.render({})
+
+    def test_basepath_rewrites_literals_only(self):
+        template = Template('<link href="/index.css" />{{ Content }}', "/site/")
+        self.assertEqual(
+            template.render({"Content": 'href="/raw"'}),
+            '<link href="/site/index.css" />href="/raw"',
+        )
+
+    def test_write_streams_nodes(self):
+        template = Template("<main>{{ Content }}</main>")
+        out = io.StringIO()
+        node = ParentNode("p", [LeafNode("b", "bold"), LeafNode(None, " text")])
+        template.write(out, {"Content": node})
+        self.assertEqual(out.getvalue(), "<main><p><b>bold</b> text</p></main>")
+        self.assertEqual(template.render({"Content": node}), out.getvalue())
+
+    def test_assets_are_fingerprinted(self):
+        template = Template(
+            '<link href="/index.css" />\n  <a href="/blog">{{ Content }}</a>',
+            "/site/",
+            {"/index.css": "/index.0123456789.css"},
+            minify=True,
+        )
+        self.assertEqual(
+            template.render({"Content": "x"}),
+            '<link href="/site/index.0123456789.css" /><a href="/site/blog">x</a>',
+        )
+
+    def test_no_placeholders(self):
+        self.assertEqual(Template("plain").render({}), "plain")
+
+
+class TestRebase(unittest.TestCase):
+    def test_rebase_url(self):
+        self.assertEqual(rebase_url("/blog", "/site/"), "/site/blog")
+        self.assertEqual(
+            rebase_url("/a.css", "/", {"/a.css": "/a.0123456789.css"}),
+            "/a.0123456789.css",
+        )
+        self.assertEqual(rebase_url("https://boot.dev", "/site/"), "https://boot.dev")
+        self.assertEqual(rebase_url("/blog", "/"), "/blog")
+
+    def test_rebase_node(self):
+        node = ParentNode(
+            "p",
+            [
+                LeafNode("a", "home", {"href": "/"}),
+                LeafNode("img", "", {"src": "/images/a.png", "alt": "a"}),
+                LeafNode(None, 'href="/text"'),
+            ],
+        )
+        rebase_node(node, "/site/")
+        self.assertEqual(
+            node.to_html(),
+            '<p><a href="/site/">home</a>'
+            '<img src="/site/images/a.png" alt="a"></img>href="/text"</p>',
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+import urllib.error
+import urllib.request
+
+from watch import changed_paths, is_within, serve_directory, snapshot
+
+
+class TestWatch(unittest.TestCase):
+    def test_snapshot_changes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            kept = os.path.join(tmp, "kept.md")
+            edited = os.path.join(tmp, "sub", "edited.md")
+            os.makedirs(os.path.dirname(edited))
+            for path in (kept, edited):
+                with open(path, "w") as f:
+                    f.write("a")
+            before = snapshot([tmp])
+            with open(edited, "w") as f:
+                f.write("longer")
+            added = os.path.join(tmp, "added.md")
+            with open(added, "w") as f:
+                f.write("b")
+            os.remove(kept)
+            self.assertEqual(
+                changed_paths(before, snapshot([tmp])), {kept, edited, added}
+            )
+
+    def test_is_within(self):
+        self.assertTrue(is_within("/site/content/a.md", "/site/content"))
+        self.assertFalse(is_within("/site/content2/a.md", "/site/content"))
+
+    def test_serve_directory_under_basepath(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, "blog"))
+            with open(os.path.join(tmp, "blog", "index.html"), "w") as f:
+                f.write("<p>blog</p>")
+            server = serve_directory(tmp, 0, basepath="/site/")
+            self.addCleanup(server.server_close)
+            self.addCleanup(server.shutdown)
+            root = f"http://127.0.0.1:{server.server_address[1]}"
+            with urllib.request.urlopen(root + "/site/blog/") as response:
+                self.assertEqual(response.read(), b"<p>blog</p>")
+            with self.assertRaises(urllib.error.HTTPError) as raised:
+                urllib.request.urlopen(root + "/blog/")
+            self.assertEqual(raised.exception.code, 404)
+            raised.exception.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,6 +12,8 @@ class TextType(Enum):
 
 
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
@@ -28,17 +30,22 @@ class TextNode:
         return f"TextNode({self.text}, {self.text_type.value}, {self.url})"
 
 
+HTML_NODE_BUILDERS = {
+    TextType.TEXT: lambda text, url: LeafNode(None, text),
+    TextType.BOLD: lambda text, url: LeafNode("b", text),
+    TextType.ITALIC: lambda text, url: LeafNode("i", text),
+    TextType.CODE: lambda text, url: LeafNode("code", text),
+    TextType.LINK: lambda text, url: LeafNode("a", text, {"href": url}),
+    TextType.IMAGE: lambda text, url: LeafNode("img", "", {"src": url, "alt": text}),
+}
+
+
+def html_node(text, text_type, url=None):
+    return HTML_NODE_BUILDERS[text_type](text, url)
+
+
 def text_node_to_html_node(text_node):
-    if text_node.text_type == TextType.TEXT:
-        return LeafNode(None, text_node.text)
-    if text_node.text_type == TextType.BOLD:
-        return LeafNode("b", text_node.text)
-    if text_node.text_type == TextType.ITALIC:
-        return LeafNode("i", text_node.text)
-    if text_node.text_type == TextType.CODE:
-        return LeafNode("code", text_node.text)
-    if text_node.text_type == TextType.LINK:
-        return LeafNode("a", text_node.text, {"href": text_node.url})
-    if text_node.text_type == TextType.IMAGE:
-        return LeafNode("img", "", {"src": text_node.url, "alt": text_node.text})
-    raise ValueError(f"invalid text type: {text_node.text_type}")
+    builder = HTML_NODE_BUILDERS.get(text_node.text_type)
+    if builder is None:
+        raise ValueError(f"invalid text type: {text_node.text_type}")
+    return builder(text_node.text, text_node.url)
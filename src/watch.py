@@ -0,0 +1,77 @@
+import functools
+import http.server
+import os
+import threading
+import time
+
+
+def snapshot(paths):
+    files = {}
+    for path in paths:
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            files[path] = (stat.st_mtime_ns, stat.st_size)
+            continue
+        for dirpath, _, filenames in os.walk(path):
+            for name in filenames:
+                fullname = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(fullname)
+                except FileNotFoundError:
+                    continue
+                files[fullname] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def changed_paths(old, new):
+    paths = old.keys() | new.keys()
+    return {path for path in paths if old.get(path) != new.get(path)}
+
+
+def is_within(path, directory):
+    return os.path.commonpath([path, directory]) == directory
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    # Serves the output under basepath, where the built links point, and
+    # answers 404 outside it, as the real host would.
+    def __init__(self, *args, basepath="/", **kwargs):
+        self.prefix = basepath.rstrip("/")
+        super().__init__(*args, **kwargs)
+
+    def is_under_basepath(self, path):
+        path = path.split("?", 1)[0].split("#", 1)[0]
+        return path == self.prefix or path.startswith(self.prefix + "/")
+
+    def send_head(self):
+        if not self.is_under_basepath(self.path):
+            self.send_error(404, "File not found")
+            return None
+        return super().send_head()
+
+    def translate_path(self, path):
+        if self.is_under_basepath(path):
+            path = path[len(self.prefix) :] or "/"
+        return super().translate_path(path)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_directory(directory, port, host="127.0.0.1", basepath="/"):
+    handler = functools.partial(QuietHandler, directory=directory, basepath=basepath)
+    server = http.server.ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def watch(paths, on_change, interval=0.2):
+    previous = snapshot(paths)
+    while True:
+        time.sleep(interval)
+        current = snapshot(paths)
+        changed = changed_paths(previous, current)
+        if changed:
+            on_change(changed)
+        previous = current